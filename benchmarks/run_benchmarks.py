@@ -0,0 +1,300 @@
+"""计算器核心路径的性能测试（不依赖 PyQt6 和 tkinter）
+
+对不同长度（10 到 1,000,000 项）的输入测量各路径的耗时和内存峰值：
+
+    python benchmarks/run_benchmarks.py run -o results.json
+    python benchmarks/run_benchmarks.py run --sizes 10,1000 --paths tokenize,evaluate
+    python benchmarks/run_benchmarks.py run -o new.json --baseline results.json
+    python benchmarks/run_benchmarks.py compare results.json new.json
+
+compare 或 --baseline 会列出比基准慢（或占用内存多）超过阈值的项目，
+有退化时返回 1，便于在脚本中检查。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from calc_engine import CompactInts, evaluate, tokenize  # noqa: E402
+from input_format import format_expression  # noqa: E402
+from number_scan import iter_number_chunks  # noqa: E402
+from vector_eval import evaluate_value  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+# 连乘的乘积随项数增长，超过这个项数时跳过，避免单项测试耗时过长
+MAX_MULTIPLY_TERMS = 100_000
+
+# 每项至少运行这么长时间（秒），取多次运行中最快的一次
+MIN_RUN_SECONDS = 0.2
+MAX_REPEAT = 5
+
+DEFAULT_THRESHOLD = 0.2
+# 耗时太短或内存太少的项目误差大，比较时忽略
+MIN_COMPARE_SECONDS = 0.001
+MIN_COMPARE_BYTES = 64 * 1024
+
+
+# ---------- 输入数据 ----------
+
+def make_add_chain(rng, terms):
+    """纯加法：123+4567+..."""
+    return "+".join(str(rng.randint(1, 999_999)) for _ in range(terms))
+
+
+def make_multiply_chain(rng, terms):
+    """纯乘法，用 * 输入，运算数较小"""
+    return "*".join(str(rng.randint(1, 3)) for _ in range(terms))
+
+
+def make_mixed(rng, terms):
+    """加减乘除混合"""
+    parts = [str(rng.randint(1, 999_999))]
+    for _ in range(terms - 1):
+        parts.append(rng.choice("+-*/"))
+        parts.append(str(rng.randint(1, 9_999)))
+    return "".join(parts)
+
+
+def make_huge_literals(rng, terms):
+    """30 到 60 位的超长数字相加"""
+    return "+".join(str(rng.randint(10 ** 29, 10 ** 60)) for _ in range(terms))
+
+
+CASES = {
+    "add": make_add_chain,
+    "multiply": make_multiply_chain,
+    "mixed": make_mixed,
+    "huge": make_huge_literals,
+}
+
+
+def make_extract_text(rng, terms):
+    """用于提取数字的文本：数字夹在中文说明中"""
+    return "".join(f"第{i}笔 金额{rng.randint(1, 999_999)}元，" for i in range(terms))
+
+
+# ---------- 测试路径 ----------
+# 每个路径由 (准备函数, 被测函数) 组成，准备函数的耗时不计入结果
+
+def prepare_raw(text):
+    return text
+
+
+def prepare_formatted(text):
+    return format_expression(text)
+
+
+def prepare_parts(text):
+    return tokenize(format_expression(text))
+
+
+def run_evaluate(parts):
+    return evaluate(parts).value()
+
+
+def run_trace(parts):
+    """计算并生成计算过程"""
+    return evaluate(parts, trace=True).steps()
+
+
+def run_extract_regex(text):
+    """number_extractor.py 的方式：正则提取后格式化并用加号连接"""
+    return " + ".join("{:,}".format(int(num)) for num in re.findall(r'\d+', text))
+
+
+def run_extract_chunks(text):
+    """calculator_qt.py 的提取线程：分块扫描，保存为 CompactInts"""
+    numbers = CompactInts()
+    for chunk, _ in iter_number_chunks(text):
+        numbers.extend(chunk)
+    return numbers
+
+
+PATHS = {
+    "format_expression": (prepare_raw, format_expression),
+    "tokenize": (prepare_formatted, tokenize),
+    "evaluate": (prepare_parts, run_evaluate),
+    "evaluate_value": (prepare_parts, evaluate_value),
+    "trace": (prepare_parts, run_trace),
+    "extract_regex": (prepare_raw, run_extract_regex),
+    "extract_chunks": (prepare_raw, run_extract_chunks),
+}
+
+# 提取数字的路径使用单独的文本输入，不区分表达式类型
+EXTRACT_PATHS = ("extract_regex", "extract_chunks")
+
+
+# ---------- 测量 ----------
+
+def measure(func, data):
+    """返回 (最快一次的耗时, 内存峰值字节数)"""
+    best = None
+    spent = 0.0
+    for _ in range(MAX_REPEAT):
+        start = time.perf_counter()
+        func(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        spent += elapsed
+        if spent >= MIN_RUN_SECONDS:
+            break
+
+    # tracemalloc 会拖慢运行，内存单独测一次
+    tracemalloc.start()
+    try:
+        func(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def iter_benchmarks(sizes, cases, paths, seed):
+    """生成 (名称, 准备好的输入, 被测函数)"""
+    for size in sizes:
+        extract_text = None
+        for path in paths:
+            prepare, func = PATHS[path]
+            if path in EXTRACT_PATHS:
+                if extract_text is None:
+                    extract_text = make_extract_text(random.Random(seed), size)
+                yield f"{path}/text/{size}", extract_text, func
+                continue
+            for case in cases:
+                if case == "multiply" and size > MAX_MULTIPLY_TERMS:
+                    continue
+                text = CASES[case](random.Random(seed), size)
+                yield f"{path}/{case}/{size}", prepare(text), func
+
+
+def run_benchmarks(sizes, cases, paths, seed=0):
+    results = {}
+    for name, data, func in iter_benchmarks(sizes, cases, paths, seed):
+        seconds, peak = measure(func, data)
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+        print(f"{name:<36}{seconds * 1000:12.3f} ms{peak / 1024:14.1f} KiB", flush=True)
+    return results
+
+
+# ---------- 比较 ----------
+
+def compare_results(baseline, current, threshold):
+    """返回退化的项目列表 [(名称, 指标, 基准值, 当前值), ...]"""
+    regressions = []
+    for name, new in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if (old["seconds"] >= MIN_COMPARE_SECONDS
+                and new["seconds"] > old["seconds"] * (1 + threshold)):
+            regressions.append((name, "seconds", old["seconds"], new["seconds"]))
+        if (old["peak_bytes"] >= MIN_COMPARE_BYTES
+                and new["peak_bytes"] > old["peak_bytes"] * (1 + threshold)):
+            regressions.append((name, "peak_bytes", old["peak_bytes"], new["peak_bytes"]))
+    return regressions
+
+
+def report_regressions(regressions, threshold):
+    if not regressions:
+        print(f"没有超过 {threshold:.0%} 的退化")
+        return 0
+    print(f"以下项目比基准退化超过 {threshold:.0%}：")
+    for name, metric, old, new in regressions:
+        if metric == "seconds":
+            print(f"  {name:<36}耗时 {old * 1000:.3f} ms -> {new * 1000:.3f} ms ({new / old:.2f}x)")
+        else:
+            print(f"  {name:<36}内存 {old / 1024:.1f} KiB -> {new / 1024:.1f} KiB ({new / old:.2f}x)")
+    return 1
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+# ---------- 命令行 ----------
+
+def parse_list(text, choices=None):
+    items = [item.strip() for item in text.split(",") if item.strip()]
+    if choices is not None:
+        unknown = [item for item in items if item not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"未知的名称：{', '.join(unknown)}")
+    return items
+
+
+def run_command(args):
+    results = run_benchmarks(args.sizes, args.cases, args.paths, args.seed)
+
+    if args.output:
+        data = {
+            "meta": {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        return report_regressions(
+            compare_results(load_results(args.baseline), results, args.threshold), args.threshold)
+    return 0
+
+
+def compare_command(args):
+    regressions = compare_results(load_results(args.baseline), load_results(args.current),
+                                  args.threshold)
+    return report_regressions(regressions, args.threshold)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run_benchmarks", description="计算器性能测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="运行性能测试")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                            type=lambda text: [int(item) for item in parse_list(text)],
+                            help="项数，用逗号分隔，默认为 10 到 1000000")
+    run_parser.add_argument("--cases", default=list(CASES),
+                            type=lambda text: parse_list(text, CASES),
+                            help=f"输入类型：{', '.join(CASES)}")
+    run_parser.add_argument("--paths", default=list(PATHS),
+                            type=lambda text: parse_list(text, PATHS),
+                            help=f"测试路径：{', '.join(PATHS)}")
+    run_parser.add_argument("--seed", type=int, default=0, help="生成输入的随机数种子")
+    run_parser.add_argument("-o", "--output", help="结果保存为 JSON 文件")
+    run_parser.add_argument("--baseline", help="与这个 JSON 结果比较")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="超过基准多少算退化，默认为 0.2（20%%）")
+    run_parser.set_defaults(func=run_command)
+
+    compare_parser = subparsers.add_parser("compare", help="比较两次测试结果")
+    compare_parser.add_argument("baseline", help="基准结果 JSON")
+    compare_parser.add_argument("current", help="新的结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="超过基准多少算退化，默认为 0.2（20%%）")
+    compare_parser.set_defaults(func=compare_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,12 +20,12 @@ PyInstaller.__main__.run([
     '--hidden-import=PyQt6.QtCore',
     '--hidden-import=PyQt6.QtGui',
     '--hidden-import=PyQt6.QtWidgets',
+    '--hidden-import=PyQt6.QtNetwork',
     '--exclude-module=matplotlib',
     '--exclude-module=numpy',
     '--exclude-module=PIL',
     '--exclude-module=pandas',
     '--exclude-module=scipy',
-    '--exclude-module=PyQt6.QtNetwork',
     '--exclude-module=PyQt6.QtQml',
     '--exclude-module=PyQt6.QtQuick',
     '--exclude-module=PyQt6.QtSql',
@@ -40,9 +40,7 @@ PyInstaller.__main__.run([
     '--exclude-module=html',
     '--exclude-module=pdb',
     '--exclude-module=pkg_resources',
-    '--exclude-module=multiprocessing',
     '--exclude-module=asyncio',
-    '--exclude-module=concurrent',
     '--exclude-module=ctypes',
     '--exclude-module=curses',
     '--exclude-module=dbm',
@@ -0,0 +1,192 @@
+"""命令行批量计算（不依赖 PyQt6 和 tkinter）
+
+逐行读取表达式，每行输出一条 JSON 结果，整个输入不会一次读入内存：
+
+    python calc_cli.py eval expressions.txt -o results.jsonl
+    python calc_cli.py eval expressions.txt --workers 8 -o results.jsonl
+    type expressions.txt | python calc_cli.py eval
+
+每行直接用计算引擎求值，与在计算器中按 Enter 相同（* 和 / 可以代替 × 和 ÷），
+不会先格式化改写表达式。除数字、千位分隔符、空白和运算符以外的字符
+（例如负号开头、小数点）都作为这一行的错误报告，空行会被跳过。
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from calc_engine import OPERATORS, ExpressionError, tokenize, format_number, FORMAT_ERROR_MESSAGE
+from vector_eval import PARALLEL_THRESHOLD, evaluate_value
+
+# 表达式中不允许出现的字符（tokenize 会忽略这些字符，核对时需要报错）
+_INVALID_CHAR = re.compile(r'[^0-9,\s' + re.escape(''.join(OPERATORS)) + ']')
+
+
+def evaluate_line(text, parallel_threshold=None):
+    """计算一行表达式，返回结果字典（成功时含 result/exact，失败时含 error）
+
+    parallel_threshold 不为 None 时，超长的表达式使用多进程计算。
+    """
+    expression = text.strip()
+    normalized = expression.replace('*', '×').replace('/', '÷')
+    match = _INVALID_CHAR.search(normalized)
+    if match:
+        return {"expression": expression, "error": f"无法识别的字符：{match.group()}"}
+    try:
+        value = evaluate_value(tokenize(normalized), parallel_threshold)
+        return {"expression": expression, "result": format_number(value), "exact": str(value)}
+    except (ValueError, ExpressionError) as e:
+        return {"expression": expression, "error": str(e)}
+    except Exception:
+        return {"expression": expression, "error": FORMAT_ERROR_MESSAGE}
+
+
+def iter_fragments(lines, first_line=1, parallel_threshold=None):
+    """逐行计算，生成 (行号, 不含行号的 JSON 片段)"""
+    for line_number, line in enumerate(lines, first_line):
+        if line.strip():
+            # 去掉开头的 "{"，写出时再补上行号
+            result = evaluate_line(line, parallel_threshold)
+            yield line_number, json.dumps(result, ensure_ascii=False)[1:]
+
+
+def write_fragments(fragments, output):
+    """将结果写成 JSON Lines，返回出错的行数"""
+    errors = 0
+    for line_number, fragment in fragments:
+        if '"error": ' in fragment:
+            errors += 1
+        output.write(f'{{"line": {line_number}, {fragment}\n')
+    return errors
+
+
+# 多进程模式下每个分片的字节数范围
+MIN_SHARD_BYTES = 64 * 1024
+MAX_SHARD_BYTES = 4 * 1024 * 1024
+
+
+def shard_ranges(path, workers):
+    """按行边界把文件切分为若干字节区间 (start, end)"""
+    size = os.path.getsize(path)
+    # 分片数量多于进程数，让各进程的负载更均匀
+    shard_bytes = min(MAX_SHARD_BYTES, max(MIN_SHARD_BYTES, size // (workers * 4) + 1))
+
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + shard_bytes
+            if end < size:
+                # 移动到下一行的开头
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            else:
+                end = size
+            yield start, end
+            start = end
+
+
+def evaluate_shard(path, start, end):
+    """在子进程中计算一个分片，返回 (行数, [(分片内行号, JSON 片段), ...])"""
+    lines = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            lines.append(line.decode("utf-8", errors="replace"))
+
+    if start == 0 and lines and lines[0].startswith("\ufeff"):
+        lines[0] = lines[0][1:]
+
+    return len(lines), list(iter_fragments(lines))
+
+
+def iter_sharded_fragments(path, workers):
+    """多进程计算文件，按输入顺序生成 (行号, JSON 片段)
+
+    同时进行的分片数量有上限，结果按提交顺序取回，内存占用与文件大小无关。
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        line_offset = 0
+
+        def collect():
+            nonlocal line_offset
+            line_count, fragments = pending.popleft().result()
+            for local_number, fragment in fragments:
+                yield line_offset + local_number, fragment
+            line_offset += line_count
+
+        for start, end in shard_ranges(path, workers):
+            pending.append(executor.submit(evaluate_shard, path, start, end))
+            if len(pending) >= workers * 2:
+                yield from collect()
+
+        while pending:
+            yield from collect()
+
+
+def run_eval(args):
+    """eval 子命令"""
+    if args.workers > 1 and args.input == "-":
+        print("--workers 需要指定输入文件，不能读取标准输入", file=sys.stderr)
+        return 2
+
+    if args.output == "-":
+        output = open(sys.stdout.fileno(), "w", encoding="utf-8", closefd=False)
+    else:
+        output = open(args.output, "w", encoding="utf-8")
+
+    with output:
+        if args.workers > 1:
+            errors = write_fragments(iter_sharded_fragments(args.input, args.workers), output)
+        else:
+            if args.input == "-":
+                source = open(sys.stdin.fileno(), encoding="utf-8-sig", closefd=False)
+            else:
+                source = open(args.input, encoding="utf-8-sig")
+            # 单进程模式下，超长的单行表达式可以使用多进程计算
+            parallel_threshold = args.parallel_threshold or None
+            with source:
+                errors = write_fragments(
+                    iter_fragments(source, parallel_threshold=parallel_threshold), output)
+
+    # 有出错的行时返回 1，便于脚本检查
+    return 1 if errors else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="calc_cli", description="数字计算器命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    eval_parser = subparsers.add_parser("eval", help="逐行计算文件或标准输入中的表达式")
+    eval_parser.add_argument("input", nargs="?", default="-",
+                             help="表达式文件，每行一个；省略或为 - 时读取标准输入")
+    eval_parser.add_argument("-o", "--output", default="-",
+                             help="结果输出文件（JSON Lines），默认为标准输出")
+    eval_parser.add_argument("-w", "--workers", type=int, default=1,
+                             help="使用多个进程并行计算（需要指定输入文件），默认为 1")
+    eval_parser.add_argument("--parallel-threshold", type=int, default=PARALLEL_THRESHOLD,
+                             help="单行表达式的数字和运算符达到这个数量时使用多进程计算，"
+                                  f"0 表示不使用，默认为 {PARALLEL_THRESHOLD}"
+                                  "（与 --workers 同时使用时不生效）")
+    eval_parser.set_defaults(func=run_eval)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+"""计算引擎：与界面无关的表达式解析和求值
+
+Qt 版和 Tk 版计算器共用这里的实现，保证两者的计算结果和错误提示一致。
+所有运算都使用 Python 整数和分数，不会因为转换为浮点数而丢失精度。
+"""
+
+import re
+from array import array
+from fractions import Fraction
+from itertools import accumulate, islice
+
+OPERATORS = ('+', '-', '×', '÷')
+
+# tokenize 结果中每个数字或运算符的编码
+NUMBER_CODE = 0
+OP_CODES = {op: code for code, op in enumerate(OPERATORS, 1)}
+OP_SYMBOLS = (None,) + OPERATORS
+
+# 错误提示
+ZERO_DIVISION_MESSAGE = "除数不能为零"
+FORMAT_ERROR_MESSAGE = "计算出错：请确保输入格式正确\n例如：123 + 456 - 789"
+
+# 结果显示的小数位数
+DISPLAY_PLACES = 2
+
+
+class ExpressionError(Exception):
+    """表达式格式不正确（缺少数字、运算符连续等）"""
+
+
+# 按运算符拆分，保留运算符
+_OPERATOR_SPLIT = re.compile('([' + re.escape(''.join(OPERATORS)) + '])')
+_OPERATOR_PATTERN = re.compile('[' + re.escape(''.join(OPERATORS)) + ']')
+_NON_DIGITS = re.compile(r'\D+')
+
+# tokenize 每次处理的文本长度，中间结果占用的内存与表达式长度无关
+TOKENIZE_CHUNK = 64 * 1024
+# 整数批量存入 array 时每批的个数
+EXTEND_BATCH = 65536
+
+
+class CompactInts:
+    """紧凑的整数序列
+
+    64 位以内的整数保存在 array('q') 中，超出的保存在 big（下标 -> 整数）中，
+    values 中对应位置记为 0。可以像列表一样取长度、按下标或切片取值和遍历。
+    """
+
+    __slots__ = ('values', 'big')
+
+    def __init__(self, values=()):
+        self.values = array('q')
+        self.big = {}
+        self.extend(values)
+
+    def append(self, value):
+        try:
+            self.values.append(value)
+        except OverflowError:
+            self.big[len(self.values)] = value
+            self.values.append(0)
+
+    def extend(self, values):
+        iterator = iter(values)
+        while True:
+            batch = list(islice(iterator, EXTEND_BATCH))
+            if not batch:
+                break
+            try:
+                # 先转换为 array，溢出时 values 不会被改动
+                self.values.extend(array('q', batch))
+            except OverflowError:
+                for value in batch:
+                    self.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if not self.big:
+                return self.values[index].tolist()
+            return [self[i] for i in range(*index.indices(len(self.values)))]
+        value = self.values[index]
+        if self.big:
+            if index < 0:
+                index += len(self.values)
+            return self.big.get(index, value)
+        return value
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, start):
+        """从下标 start 开始遍历"""
+        if not self.big:
+            return islice(self.values, start, None)
+        return (self.big.get(i, self.values[i]) for i in range(start, len(self.values)))
+
+    def tolist(self):
+        return list(self)
+
+
+class Tokens:
+    """tokenize 的结果：数字和运算符分开保存
+
+    codes 为 bytes，每个数字或运算符一个字节（NUMBER_CODE 或 OP_CODES 中的编码）；
+    operands 为 CompactInts，按顺序保存所有数字。
+    可以像原来的列表一样取长度、按下标取出数字（int）或运算符（str）和遍历。
+    """
+
+    __slots__ = ('codes', 'operands')
+
+    def __init__(self, codes, operands):
+        self.codes = codes
+        self.operands = operands
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        if code != NUMBER_CODE:
+            return OP_SYMBOLS[code]
+        if index < 0:
+            index += len(self.codes)
+        # 前面有几个数字
+        return self.operands[self.codes.count(NUMBER_CODE, 0, index)]
+
+    def __iter__(self):
+        operands = iter(self.operands)
+        for code in self.codes:
+            yield next(operands) if code == NUMBER_CODE else OP_SYMBOLS[code]
+
+    def is_alternating(self):
+        """是否为数字开头和结尾、数字和运算符交替出现"""
+        codes = self.codes
+        return (len(codes) % 2 == 1
+                and codes[0::2].count(NUMBER_CODE) == len(codes) // 2 + 1
+                and codes.count(NUMBER_CODE) == len(codes) // 2 + 1)
+
+    def is_sum_chain(self):
+        """是否为只有加法的表达式"""
+        return (self.is_alternating()
+                and self.codes[1::2].count(OP_CODES['+']) == len(self.codes) // 2)
+
+    def key(self):
+        """可以作为字典键的紧凑表示"""
+        return self.codes, self.operands.values.tobytes(), tuple(sorted(self.operands.big.items()))
+
+
+def _iter_chunks(text):
+    """把文本切分为若干段，每段（除第一段外）从运算符开始，不会切断数字"""
+    start = 0
+    while start < len(text):
+        match = _OPERATOR_PATTERN.search(text, start + TOKENIZE_CHUNK)
+        if match is None:
+            yield text[start:]
+            return
+        yield text[start:match.start()]
+        start = match.start()
+
+
+def _tokenize_chunk(chunk, codes, operands):
+    """拆分一段文本，结果追加到 codes 和 operands"""
+    # pieces 为 [文本, 运算符, 文本, ..., 文本]，文本可能为空
+    # 移除空格和千位分隔符（含 × 和 ÷ 的文本用 replace 比 translate 快得多）
+    pieces = _OPERATOR_SPLIT.split(chunk.replace(' ', '').replace(',', ''))
+    texts = pieces[0::2]
+    ops = pieces[1::2]
+    leading_op = not texts[0]
+    if leading_op:
+        texts = texts[1:]
+
+    try:
+        # 常见情况：每段文本都是一个数字，用 C 实现的函数一次处理整段
+        numbers = list(map(int, texts))
+    except ValueError:
+        numbers = None
+
+    if numbers is not None and len(numbers) == len(ops) + (0 if leading_op else 1):
+        op_codes = bytes(map(OP_CODES.__getitem__, ops))
+        chunk_codes = bytearray(len(op_codes) + len(numbers))
+        chunk_codes[0 if leading_op else 1::2] = op_codes
+        codes += chunk_codes
+        operands.extend(numbers)
+        return
+
+    # 有空白、其他字符或运算符连续出现时逐段处理
+    for index, piece in enumerate(pieces):
+        if index % 2:
+            codes.append(OP_CODES[piece])
+            continue
+        if not piece:
+            continue
+        try:
+            number = int(piece)
+        except ValueError:
+            digits = _NON_DIGITS.sub('', piece)
+            if not digits:
+                continue
+            number = int(digits)
+        codes.append(NUMBER_CODE)
+        operands.append(number)
+
+
+def tokenize(expression):
+    """将表达式拆分为数字和运算符，返回 Tokens
+
+    运算符之间的所有数字字符连成一个数字，其他字符（空格、逗号等）都被忽略。
+    长文本分段处理，每段只复制一次并经过一次正则拆分。
+    """
+    codes = bytearray()
+    operands = CompactInts()
+    for chunk in _iter_chunks(expression):
+        _tokenize_chunk(chunk, codes, operands)
+    return Tokens(bytes(codes), operands)
+
+
+def _simplify(value):
+    """分母为 1 的分数转换为整数"""
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return value.numerator
+    return value
+
+
+class Accumulator:
+    """一次遍历的求值状态
+
+    total 为已经结束的加减项之和，op 为连接 total 和当前项的加减运算符。
+    当前乘除项保存为整数分子 num 和分母 den：乘法乘到分子上，除法乘到
+    分母上，整串乘除只在取值时做一次整数除法，全程不经过浮点数，
+    大整数不会丢失精度或溢出。每追加一项只做常数次运算。
+
+    trace 为 True 时记录每一步运算 (左值, 运算符, 右值, 结果)，
+    乘除步骤和加减步骤分开保存，与原来的“计算过程”顺序一致。
+    """
+
+    def __init__(self, first, trace=False):
+        self.total = None
+        self.op = None
+        self.num = first
+        self.den = 1
+        self.trace = trace
+        self.multiply_steps = [] if trace else None
+        self.add_steps = [] if trace else None
+        self._traced_term = first
+
+    def copy(self):
+        """复制当前状态，副本可以继续追加而不影响原对象"""
+        acc = Accumulator.__new__(Accumulator)
+        acc.__dict__.update(self.__dict__)
+        if self.trace:
+            acc.multiply_steps = list(self.multiply_steps)
+            acc.add_steps = list(self.add_steps)
+        return acc
+
+    def push(self, op, operand):
+        """追加一个运算符和它右边的数字"""
+        if op == '×':
+            self.num *= operand
+        elif op == '÷':
+            if operand == 0:
+                raise ValueError(ZERO_DIVISION_MESSAGE)
+            self.den *= operand
+        elif op in ('+', '-'):
+            self._flush()
+            self.op = op
+            self.num = operand
+            self.den = 1
+            self._traced_term = operand
+            return
+        else:
+            raise ExpressionError(f"未知的运算符：{op}")
+
+        if self.trace:
+            # 从上一步的值算出这一步，不必每一步都把整串乘除约分一次
+            left = self._traced_term
+            if op == '×':
+                self._traced_term = _simplify(left * operand)
+            else:
+                self._traced_term = _simplify(Fraction(left) / operand)
+            self.multiply_steps.append((left, op, operand, self._traced_term))
+
+    def term(self):
+        """当前乘除项的值（整数或分数）"""
+        if self.trace:
+            return self._traced_term
+        if self.den == 1:
+            return self.num
+        return _simplify(Fraction(self.num, self.den))
+
+    def _flush(self):
+        """把当前项并入加减总和"""
+        term = self.term()
+        if self.total is None:
+            self.total = term
+            return
+        result = self._combine(term)
+        if self.trace:
+            self.add_steps.append((self.total, self.op, term, result))
+        self.total = result
+
+    def _combine(self, term):
+        if self.op == '+':
+            return _simplify(self.total + term)
+        return _simplify(self.total - term)
+
+    def value(self):
+        """当前结果（不改变状态，可以继续追加）"""
+        term = self.term()
+        if self.total is None:
+            return term
+        return self._combine(term)
+
+    def steps(self):
+        """返回 (乘除步骤, 加减步骤)，包含尚未并入总和的最后一项"""
+        add_steps = list(self.add_steps)
+        if self.total is not None:
+            term = self.term()
+            add_steps.append((self.total, self.op, term, self._combine(term)))
+        return self.multiply_steps, add_steps
+
+
+def evaluate(parts, trace=False, acc=None, start=1):
+    """按先乘除后加减的顺序一次遍历求值，返回 Accumulator
+
+    传入 acc 时从 parts[start] 开始继续追加到 acc 上，用于在已经计算过的
+    前缀之后只计算新增的部分。
+    """
+    if isinstance(parts, Tokens):
+        if parts.is_alternating():
+            return _evaluate_tokens(parts, trace, acc, start)
+        # 格式不正确时按编码一次找出出错的位置，不按下标逐个取出（每次取值都要从头数）
+        codes = parts.codes
+        if acc is None:
+            if not codes or codes[0] != NUMBER_CODE:
+                raise ExpressionError("表达式必须以数字开头")
+            start = 1
+        _check_codes(codes, start)
+        # 前缀可能不是交替的，按编码数出 parts[start + 1] 是第几个数字
+        return _evaluate_tokens(parts, trace, acc, start,
+                                operand_start=codes.count(NUMBER_CODE, 0, start + 1))
+
+    if acc is None:
+        if not parts or isinstance(parts[0], str):
+            raise ExpressionError("表达式必须以数字开头")
+        acc = Accumulator(parts[0], trace=trace)
+        start = 1
+
+    n = len(parts)
+    i = start
+    while i < n:
+        op = parts[i]
+        if i + 1 >= n:
+            raise ExpressionError("表达式不能以运算符结尾")
+        operand = parts[i + 1]
+        if not isinstance(op, str) or isinstance(operand, str):
+            raise ExpressionError("数字和运算符必须交替出现")
+        acc.push(op, operand)
+        i += 2
+    return acc
+
+
+def _check_codes(codes, start):
+    """检查 codes[start:] 是否为“运算符、数字”交替，不是时抛出与逐项检查相同的 ExpressionError"""
+    number = bytes([NUMBER_CODE])
+    ops = codes[start::2]
+    values = codes[start + 1::2]
+    # 第一个出错的运算符位置：运算符位置上是数字，或数字位置上是运算符
+    bad = []
+    index = ops.find(number)
+    if index >= 0:
+        bad.append(start + 2 * index)
+    index = len(values) - len(values.lstrip(number))
+    if index < len(values):
+        bad.append(start + 2 * index)
+    if (len(codes) - start) % 2:
+        bad.append(len(codes) - 1)
+    if not bad:
+        return
+    i = min(bad)
+    if i + 1 >= len(codes):
+        raise ExpressionError("表达式不能以运算符结尾")
+    raise ExpressionError("数字和运算符必须交替出现")
+
+
+def _evaluate_tokens(tokens, trace, acc, start, operand_start=None):
+    """evaluate 的快速路径：格式正确的 Tokens 直接按编码遍历，不生成中间列表"""
+    if acc is None:
+        operands = iter(tokens.operands)
+        acc = Accumulator(next(operands), trace=trace)
+        start = 1
+    else:
+        if operand_start is None:
+            operand_start = (start + 1) // 2
+        operands = tokens.operands.iter_from(operand_start)
+
+    push = acc.push
+    for code, operand in zip(tokens.codes[start::2], operands):
+        push(OP_SYMBOLS[code], operand)
+    return acc
+
+
+def evaluate_expression(expression, trace=False):
+    """解析并计算表达式文本，返回 Accumulator"""
+    return evaluate(tokenize(expression), trace=trace)
+
+
+class SumSteps:
+    """纯加法表达式的计算步骤
+
+    只保存数字和前缀和（CompactInts），每一步 (左值, '+', 右值, 结果)
+    在访问时才生成，可以直接作为 Accumulator.steps() 的加减步骤使用。
+    """
+
+    def __init__(self, numbers, totals=None):
+        self.numbers = numbers
+        self.totals = totals if totals is not None else CompactInts(accumulate(numbers))
+
+    def __len__(self):
+        return max(len(self.numbers) - 1, 0)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return (self.totals[index], '+', self.numbers[index + 1], self.totals[index + 1])
+
+    def total(self):
+        return self.totals[-1] if self.totals else 0
+
+
+def format_number(value, places=DISPLAY_PLACES):
+    """格式化数字：加千位分隔符，小数四舍五入到 places 位
+
+    分数只展开到显示需要的位数，不计算完整的小数。
+    四舍五入后是整数时不显示小数部分，例如 2.001 显示为 "2"。
+    """
+    if isinstance(value, int):
+        return f"{value:,}"
+
+    scale = 10 ** places
+    scaled, remainder = divmod(abs(value.numerator) * scale, value.denominator)
+    if remainder * 2 >= value.denominator:
+        scaled += 1
+
+    sign = "-" if value < 0 and scaled else ""
+    whole, decimals = divmod(scaled, scale)
+    if not decimals:
+        return f"{sign}{whole:,}"
+    return f"{sign}{whole:,}.{decimals:0{places}d}"
@@ -4,6 +4,13 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import re
 
+from calc_engine import tokenize, format_number, FORMAT_ERROR_MESSAGE
+from vector_eval import evaluate_value
+from edit_history import EditHistory, diff_texts
+
+# 移动光标的按键，松开后结束连续输入
+NAVIGATION_KEYS = frozenset(('Left', 'Right', 'Up', 'Down', 'Home', 'End', 'Prior', 'Next'))
+
 class Calculator:
     def __init__(self, root):
         self.root = root
@@ -213,10 +220,21 @@ class Calculator:
                 bootstyle="secondary"
             ).pack(anchor=W)
         
+        # 撤销和重做：history_text 为上一次记录时输入框的内容
+        self.edit_history = EditHistory()
+        self.history_text = ""
+        
+        # 从文件提取的数字太多时输入框只显示一部分，计算使用提取时得到的合计
+        self.extracted_total = None
+        
         # 绑定快捷键和格式化
         root.bind('<Return>', lambda e: self.calculate())
         self.display.bind('<KeyRelease>', self.format_input)
         self.display.bind('<FocusOut>', self.format_input)
+        self.display.bind('<Control-z>', self.undo)
+        self.display.bind('<Control-y>', self.redo)
+        # 点击移动光标后的输入另起一步撤销
+        self.display.bind('<ButtonRelease-1>', lambda e: self.edit_history.end_typing())
         
         # 设置窗口居中
         self.center_window()
@@ -262,6 +280,7 @@ class Calculator:
             # 更新显示
             self.display.delete("1.0", tk.END)
             self.display.insert("1.0", text)
+            self.record_edit()
             
             # 让输入框获得焦点并将光标移到末尾
             self.display.focus_set()
@@ -272,42 +291,26 @@ class Calculator:
     
     def format_input(self, event=None):
         """格式化输入内容"""
+        if self.extracted_total is not None:
+            return
+        if event is not None and getattr(event, 'keysym', None) in NAVIGATION_KEYS:
+            # 方向键等移动光标后的输入另起一步撤销
+            self.edit_history.end_typing()
+            return
         try:
             # 获取当前输入
             text = self.display.get("1.0", tk.END).strip()
             if not text:
+                self.record_edit()
                 return
             
-            # 移除所有空格和逗号
-            text = text.replace(" ", "").replace(",", "")
-            
-            # 分割数字和运算符
-            parts = []
-            current_num = ""
-            
-            for char in text:
-                if char in ['+', '-', '×', '÷']:
-                    if current_num:
-                        parts.append(current_num)
-                        current_num = ""
-                    parts.append(char)
-                elif char.isdigit():
-                    current_num += char
-            
-            if current_num:
-                parts.append(current_num)
-            
-            # 格式化每个部分
+            # 分割数字和运算符，并格式化每个部分
             formatted_parts = []
-            for part in parts:
-                if part in ['+', '-', '×', '÷']:
+            for part in tokenize(text):
+                if isinstance(part, str):
                     formatted_parts.append(f" {part} ")
                 else:
-                    try:
-                        num = int(part)
-                        formatted_parts.append(f"{num:,}")
-                    except:
-                        formatted_parts.append(part)
+                    formatted_parts.append(f"{part:,}")
             
             # 组合格式化后的文本
             formatted_text = "".join(formatted_parts)
@@ -315,33 +318,52 @@ class Calculator:
             # 更新显示
             self.display.delete("1.0", tk.END)
             self.display.insert("1.0", formatted_text)
+            self.record_edit()
                 
         except Exception:
             pass
     
+    def record_edit(self):
+        """把输入框与上一次记录时的差异作为一步记入撤销历史
+        
+        输入和随后的格式化合并为一个编辑，只保存变化的部分。
+        """
+        text = self.display.get("1.0", "end-1c")
+        edit = diff_texts(self.history_text, text)
+        self.history_text = text
+        if edit is None:
+            return
+        position, removed, inserted = edit
+        # 输入一个数字（格式化可能同时移动千位分隔符）时与之前的输入合并
+        typing = (0 < len(inserted) - len(removed) <= 2
+                  and (removed + inserted).replace(',', '').isdigit())
+        self.edit_history.record(position, removed, inserted, typing=typing)
+    
+    def undo(self, event=None):
+        self.apply_edits(self.edit_history.undo())
+        return 'break'
+    
+    def redo(self, event=None):
+        self.apply_edits(self.edit_history.redo())
+        return 'break'
+    
+    def apply_edits(self, edits):
+        """执行撤销或重做得到的替换，光标放在最后一处替换之后"""
+        for position, length, text in edits:
+            self.display.delete(f"1.0+{position}c", f"1.0+{position + length}c")
+            self.display.insert(f"1.0+{position}c", text)
+            self.display.mark_set(tk.INSERT, f"1.0+{position + len(text)}c")
+        self.history_text = self.display.get("1.0", "end-1c")
+    
     def calculate(self):
         """计算结果"""
+        self.edit_history.end_typing()
+        if self.extracted_total is not None:
+            self.show_result(self.display.get("1.0", "end-1c"), self.extracted_total)
+            return
         try:
-            expression = self.display.get("1.0", tk.END).strip()
-            
-            # 移除所有空格和逗号
-            expression = expression.replace(" ", "").replace(",", "")
-            
-            # 分割数字和运算符
-            parts = []
-            current_num = ""
-            
-            for char in expression:
-                if char in ['+', '-', '×', '÷']:
-                    if current_num:
-                        parts.append(int(current_num))
-                        current_num = ""
-                    parts.append(char)
-                elif char.isdigit():
-                    current_num += char
-            
-            if current_num:
-                parts.append(int(current_num))
+            expression = self.display.get("1.0", tk.END)
+            parts = tokenize(expression)
             
             # 准备计算过程显示
             process_text = ""
@@ -351,69 +373,37 @@ class Calculator:
                 else:
                     process_text += f" {part} "
             
-            self.process_display.configure(state="normal")
-            self.process_display.delete("1.0", tk.END)
-            self.process_display.insert("1.0", process_text)
-            self.process_display.configure(state="disabled")
-            
-            # 算结果
-            # 先处理除法
-            i = 0
-            while i < len(parts):
-                if isinstance(parts[i], str) and parts[i] in ['×', '÷']:
-                    left = parts[i-1]
-                    right = parts[i+1]
-                    
-                    if parts[i] == '×':
-                        result = left * right
-                    else:  # 除法
-                        if right == 0:
-                            raise ValueError("除数不能为零")
-                        result = left / right
-                    
-                    # 替换计算结果
-                    parts[i-1:i+2] = [result]
-                    i -= 1
-                i += 1
-            
-            # 再处理加减法
-            result = parts[0]
-            i = 1
-            while i < len(parts):
-                if parts[i] == '+':
-                    result += parts[i+1]
-                elif parts[i] == '-':
-                    result -= parts[i+1]
-                i += 2
-            
-            # 显示最终结果
-            self.result_display.configure(state="normal")
-            self.result_display.delete(0, tk.END)
-            
-            if isinstance(result, int) or result.is_integer():
-                result = int(result)
-                self.result_display.insert(0, f"= {result:,}")
-            else:
-                # 处理小数，保2位
-                result = round(result, 2)
-                if result == int(result):
-                    self.result_display.insert(0, f"= {int(result):,}")
-                else:
-                    self.result_display.insert(0, f"= {result:,.2f}")
-            
-            self.result_display.configure(state="readonly")
+            # 计算结果（先乘除后加减）
+            result = evaluate_value(parts)
+            self.show_result(process_text, result)
             
         except ValueError as ve:
             messagebox.showerror("错误", str(ve))
         except Exception as e:
-            messagebox.showerror(
-                "错误",
-                "计算出错：请确保输入格式正确\n例如：123 + 456 - 789"
-            )
+            messagebox.showerror("错误", FORMAT_ERROR_MESSAGE)
+    
+    def show_result(self, process_text, result):
+        """显示计算过程和结果"""
+        self.process_display.configure(state="normal")
+        self.process_display.delete("1.0", tk.END)
+        self.process_display.insert("1.0", process_text)
+        self.process_display.configure(state="disabled")
+        
+        # 显示最终结果（小数保留2位）
+        self.result_display.configure(state="normal")
+        self.result_display.delete(0, tk.END)
+        self.result_display.insert(0, f"= {format_number(result)}")
+        self.result_display.configure(state="readonly")
     
     def clear(self):
-        """清除输入和结果"""
+        """清除输入和结果（可以撤销）"""
+        if self.extracted_total is not None:
+            # 只显示了部分数字，清除后不能撤销回去
+            self.extracted_total = None
+            self.display.configure(state="normal")
+            self.history_text = ""
         self.display.delete("1.0", tk.END)
+        self.record_edit()
         self.process_display.configure(state="normal")
         self.process_display.delete("1.0", tk.END)
         self.process_display.configure(state="disabled")
@@ -440,9 +430,19 @@ class Calculator:
         """打开提取数字对话框"""
         from number_extractor import NumberExtractor
         
-        def update_display(result):
+        def update_display(result, total=None):
+            if self.extracted_total is not None:
+                self.clear()
             self.display.delete("1.0", tk.END)
             self.display.insert("1.0", result)
+            if total is None:
+                self.record_edit()
+                return
+            # 数字太多时输入框只读，计算使用提取时得到的合计，不能撤销到这之前
+            self.extracted_total = total
+            self.display.configure(state="disabled")
+            self.edit_history.clear()
+            self.history_text = self.display.get("1.0", "end-1c")
         
         NumberExtractor(self.root, update_display)
 
@@ -1,23 +1,410 @@
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QPushButton, QLabel, QTextEdit, QLineEdit,
-                            QMessageBox, QDialog)
-from PyQt6.QtCore import Qt, QPropertyAnimation, QPoint, QEasingCurve
-from PyQt6.QtGui import QFont, QIcon
 import sys
-import os
-from functools import partial
 import time
 
+# 启动计时起点（--startup-profile），放在导入 PyQt6 之前
+STARTUP_BEGIN = time.perf_counter()
+
+if __name__ == "__main__":
+    # 打包后多进程计算的子进程也从这里启动，需要最先处理
+    from multiprocessing import freeze_support
+    freeze_support()
+    # 已有实例在运行时把参数转交给它后直接退出，不再加载界面模块
+    from single_instance import forward_to_running_instance
+    if forward_to_running_instance(sys.argv):
+        sys.exit(0)
+
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
+                            QHBoxLayout, QPushButton, QLabel, QTextEdit, QPlainTextEdit, QLineEdit,
+                            QMessageBox, QDialog, QListView, QFileDialog, QProgressBar)
+from PyQt6.QtCore import (Qt, QPropertyAnimation, QPoint, QEasingCurve,
+                          QAbstractListModel, QModelIndex, QObject, QRunnable,
+                          QThreadPool, QTimer, pyqtSignal)
+from PyQt6.QtGui import QFont, QIcon, QTextCursor, QKeySequence, QShortcut
+import os
+from functools import partial, lru_cache
+from itertools import accumulate
+
+from calc_engine import (OPERATORS, CompactInts, SumSteps, tokenize, format_number,
+                         FORMAT_ERROR_MESSAGE)
+from vector_eval import MIN_VECTOR_TOKENS, PARALLEL_THRESHOLD, evaluate_value, sum_steps
+from input_format import format_expression, format_paste, format_region, map_cursor, wrap_lines
+from result_cache import ResultCache
+from live_total import RunningTotal
+from number_scan import iter_number_chunks, map_file
+from column_totals import column_totals
+from single_instance import InstanceServer, launch_arguments
+from latency import LatencyRecorder, dump_path_from_env, instrument
+from history import History, path_from_env as history_path_from_env
+from edit_history import EditHistory
+from clipboard_watch import RecentPayloads, payload_hash
+
 # 在文件开头添加获取图标路径的代码
 ICON_PATH = os.path.join(os.path.dirname(__file__), 'icon.ico')
 
 # 添加字体常量
 FONT_FAMILY = "Microsoft YaHei UI"
+MONO_FONT_FAMILY = "Consolas"
+
+# 计算结果缓存的条数
+RESULT_CACHE_SIZE = 64
+
+# 提取的数字超过这个数量时，输入框只显示前面一部分
+EXTRACT_DISPLAY_LIMIT = 2000
+
+# 输入超过这个字符数时切换为大文档模式：改用按行布局的 QPlainTextEdit，
+# 不再做整段格式化、整段重新计算实时合计和生成计算过程
+LARGE_DOCUMENT_CHARS = 100_000
+# 大文档模式下每行大约的字符数，一行太长时每次按键都要重新布局整行
+LARGE_DOCUMENT_LINE_CHARS = 1000
+
+# 粘贴超过这个字符数的文本时整理格式后一次插入，不经过逐段的增量格式化
+PASTE_FAST_PATH_CHARS = 10_000
+
+# 在中间修改后，停止输入这么久（毫秒）才在后台重新计算实时结果
+LIVE_RESULT_DELAY_MS = 150
+# 末尾新增的文本（例如粘贴）超过这个字符数时也交给后台计算
+LIVE_TAIL_CHARS = 10_000
+
+# 编辑前记录光标附近这么多个字符，用于得到被删除的文本（撤销用）
+UNDO_CAPTURE_MARGIN = 64
+
+# 设置环境变量 CALC_LATENCY 时记录这些方法的耗时
+LATENCY_METHODS = ("eventFilter", "on_text_changed", "format_input", "add_operator", "calculate")
+# 显示或隐藏延迟统计的快捷键
+LATENCY_OVERLAY_SHORTCUT = "Ctrl+Shift+L"
+# 打开历史记录的快捷键
+HISTORY_SHORTCUT = "Ctrl+H"
+
+# 移动光标的按键，按下后结束连续输入
+NAVIGATION_KEYS = frozenset((Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down,
+                             Qt.Key.Key_Home, Qt.Key.Key_End, Qt.Key.Key_PageUp,
+                             Qt.Key.Key_PageDown))
+
+# 整个应用共用一份样式表，启动时只解析一次。
+# 控件通过 objectName 或动态属性（box、kind、hint）选择样式。
+APP_STYLESHEET = """
+    /* 带边框的输入框、结果框和计算过程 */
+    *[box="true"] {
+        border: 1px solid #ddd;
+        background-color: white;
+        padding: 8px;
+    }
+    #inputArea {
+        margin-bottom: 20px;
+    }
+    #processDisplay {
+        margin-bottom: 5px;
+    }
+
+    /* 现代风格滚动条 */
+    *[box="true"] QScrollBar:vertical {
+        border: none;
+        background: #f5f5f5;
+        width: 8px;
+        margin: 0px;
+    }
+    *[box="true"] QScrollBar::handle:vertical {
+        background: rgba(0, 0, 0, 0.2);
+        min-height: 20px;
+        border-radius: 4px;
+    }
+    *[box="true"] QScrollBar::handle:vertical:hover {
+        background: rgba(0, 0, 0, 0.3);
+    }
+    *[box="true"] QScrollBar::handle:vertical:pressed {
+        background: rgba(0, 0, 0, 0.4);
+    }
+    *[box="true"] QScrollBar::add-line:vertical, *[box="true"] QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    *[box="true"] QScrollBar::add-page:vertical, *[box="true"] QScrollBar::sub-page:vertical {
+        background: none;
+    }
+
+    /* 按钮 */
+    QPushButton[kind] {
+        color: white;
+        border: none;
+        border-radius: 4px;
+    }
+    QPushButton[kind]:focus {
+        outline: none;
+    }
+    QPushButton[kind="primary"] {
+        background-color: #2196F3;
+    }
+    QPushButton[kind="primary"]:hover {
+        background-color: #1976D2;
+    }
+    QPushButton[kind="primary"]:pressed {
+        background-color: #0D47A1;
+    }
+    QPushButton[kind="secondary"] {
+        background-color: #757575;
+    }
+    QPushButton[kind="secondary"]:hover {
+        background-color: #616161;
+    }
+    QPushButton[kind="secondary"]:pressed {
+        background-color: #424242;
+    }
+    QPushButton[kind="secondary"]:checked {
+        background-color: #2196F3;
+    }
+    QPushButton[kind="extract"] {
+        background-color: #9C27B0;
+    }
+    QPushButton[kind="extract"]:hover {
+        background-color: #9C27B0dd;
+    }
+    QPushButton[kind="extract"]:pressed {
+        background-color: #9C27B0aa;
+    }
+    QPushButton[kind="clear"] {
+        background-color: #F44336;
+    }
+    QPushButton[kind="clear"]:hover {
+        background-color: #F44336dd;
+    }
+    QPushButton[kind="clear"]:pressed {
+        background-color: #F44336aa;
+    }
+    QPushButton[kind="calculate"] {
+        background-color: #4CAF50;
+    }
+    QPushButton[kind="calculate"]:hover {
+        background-color: #4CAF50dd;
+    }
+    QPushButton[kind="calculate"]:pressed {
+        background-color: #4CAF50aa;
+    }
+    #extractorDialog QPushButton[kind] {
+        padding: 0 20px;
+    }
+    #buttonContainer, #buttonContainer QWidget {
+        margin-top: 10px;  /* 给按钮容器添加上边距 */
+    }
+
+    /* 提取数字面板 */
+    #extractorDialog {
+        background-color: white;
+        border: none;
+        border-left: 1px solid #ddd;
+    }
+    QProgressBar {
+        border: none;
+        background: #f5f5f5;
+        border-radius: 3px;
+    }
+    QProgressBar::chunk {
+        background-color: #2196F3;
+        border-radius: 3px;
+    }
+
+    QLabel[hint="true"] {
+        color: #666;
+    }
+    #latencyOverlay {
+        background-color: rgba(0, 0, 0, 0.75);
+        color: white;
+        padding: 6px;
+    }
+"""
+
+
+@lru_cache(maxsize=None)
+def get_font(family, size, bold=False):
+    """返回共用的字体对象，相同的字体只创建一次"""
+    if bold:
+        return QFont(family, size, QFont.Weight.Bold)
+    return QFont(family, size)
+
+
+def install_app_style():
+    """为整个应用设置样式表（只设置一次）"""
+    app = QApplication.instance()
+    if app.property("calculatorStyled"):
+        return
+    app.setStyleSheet(APP_STYLESHEET)
+    app.setProperty("calculatorStyled", True)
+
+
+def make_button(text, kind, height):
+    """创建使用应用样式表的按钮"""
+    btn = QPushButton(text)
+    btn.setFont(get_font(FONT_FAMILY, 12))
+    btn.setFixedHeight(height)
+    btn.setProperty("kind", kind)
+    return btn
+
+
+class StartupProfiler:
+    """记录启动各阶段的耗时（--startup-profile）"""
+
+    def __init__(self, begin):
+        self.begin = begin
+        self.last = begin
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        # 中文宽度不一致，耗时放在前面便于对齐
+        lines = [f"{ms:8.1f} ms  {name}" for name, ms in self.phases]
+        lines.append(f"{(self.last - self.begin) * 1000:8.1f} ms  首次绘制总耗时")
+        text = "\n".join(lines)
+        # 打包为窗口程序时没有 stderr，写入当前目录下的文件
+        if sys.stderr:
+            print(text, file=sys.stderr)
+        else:
+            with open("startup_profile.txt", "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+class ExtractSignals(QObject):
+    """提取数字任务的信号（QRunnable 本身不能发送信号）"""
+    progress = pyqtSignal(int)      # 进度百分比
+    finished = pyqtSignal(object)   # 提取到的数字（CompactInts）
+    failed = pyqtSignal(str)        # 错误信息
+    cancelled = pyqtSignal()
+
+
+class ExtractWorker(QRunnable):
+    """在线程池中提取数字，不阻塞界面，可以中途取消"""
+
+    def __init__(self, text=None, path=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.text = text
+        self.path = path
+        self.signals = ExtractSignals()
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def run(self):
+        try:
+            if self.path:
+                with map_file(self.path) as data:
+                    numbers = self.scan(data)
+            else:
+                numbers = self.scan(self.text)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if numbers is None:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(numbers)
+
+    def scan(self, data):
+        """分块提取数字，保存为紧凑的 CompactInts；取消时返回 None"""
+        numbers = CompactInts()
+        size = len(data) or 1
+        last_percent = -1
+
+        for chunk, scanned in iter_number_chunks(data):
+            if self.is_cancelled:
+                return None
+            numbers.extend(chunk)
+
+            percent = scanned * 100 // size
+            if percent != last_percent:
+                self.signals.progress.emit(percent)
+                last_percent = percent
+
+        return numbers
+
+
+class ClipboardSumWorker(ExtractWorker):
+    """对剪贴板文本中的数字求和，结果为 (数字个数, 合计)，不保存数字本身"""
+
+    def __init__(self, key, text):
+        super().__init__(text=text)
+        self.key = key  # 剪贴板内容的哈希值
+
+    def scan(self, data):
+        count = total = 0
+        for chunk, _ in iter_number_chunks(data):
+            if self.is_cancelled:
+                return None
+            count += len(chunk)
+            total += sum(chunk)
+        return count, total
+
+
+class ColumnTotalsWorker(QRunnable):
+    """在线程池中计算表格各列的合计，信号与 ExtractWorker 相同"""
+
+    def __init__(self, path, columns=None, group_by=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.columns = columns
+        self.group_by = group_by
+        self.signals = ExtractSignals()
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def run(self):
+        try:
+            totals = column_totals(self.path, self.columns, self.group_by,
+                                   progress=self.signals.progress.emit,
+                                   is_cancelled=lambda: self.is_cancelled)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if totals is None:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(totals)
+
+
+class LiveResultSignals(QObject):
+    """实时结果任务的信号"""
+    finished = pyqtSignal(int, object, object)  # 编辑序号, RunningTotal, 结果
+
+
+class LiveResultWorker(QRunnable):
+    """在后台线程重新计算整段文本的实时合计
+
+    generation 为提交任务时的编辑序号，结果返回时序号已经变化说明
+    之后又有编辑，结果直接丢弃。
+    """
+
+    def __init__(self, generation, text):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.generation = generation
+        self.text = text
+        self.signals = LiveResultSignals()
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = True
+
+    def run(self):
+        if self.is_cancelled:
+            return
+        running = RunningTotal()
+        value = running.rebuild(self.text)
+        if not self.is_cancelled:
+            self.signals.finished.emit(self.generation, running, value)
+
 
 class NumberExtractorDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent, Qt.WindowType.FramelessWindowHint)
         self.setWindowTitle("提取数字")
+        self.setObjectName("extractorDialog")
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground)
         
         if parent:
             # 获取父窗口的位置和大小
@@ -29,118 +416,87 @@ class NumberExtractorDialog(QDialog):
         else:
             self.setFixedSize(400, 700)
         
-        # 移除所有边框，添加左边框
-        self.setStyleSheet("""
-            QDialog {
-                background-color: white;
-                border: none;
-                border-left: 1px solid #ddd;
-            }
-        """)
-        
         layout = QVBoxLayout(self)
         layout.setContentsMargins(15, 15, 15, 15)
         layout.setSpacing(10)
         
         # 标题
         title = QLabel("提取数字工具")
-        title.setFont(QFont(FONT_FAMILY, 16, QFont.Weight.Bold))
+        title.setFont(get_font(FONT_FAMILY, 16, bold=True))
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
         
         # 输入区域
         input_label = QLabel("请输入包含数字的文本：")
-        input_label.setFont(QFont(FONT_FAMILY, 12))
+        input_label.setFont(get_font(FONT_FAMILY, 12))
         layout.addWidget(input_label)
         
         self.input_area = QTextEdit()
-        self.input_area.setFont(QFont(FONT_FAMILY, 12))
-        self.input_area.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid #ddd;
-                background-color: white;
-                padding: 8px;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #f5f5f5;
-                width: 8px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: rgba(0, 0, 0, 0.2);
-                min-height: 20px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: rgba(0, 0, 0, 0.3);
-            }
-            QScrollBar::handle:vertical:pressed {
-                background: rgba(0, 0, 0, 0.4);
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        self.input_area.setFont(get_font(FONT_FAMILY, 12))
+        self.input_area.setProperty("box", True)
         layout.addWidget(self.input_area)
         
         # 按钮区
         button_layout = QHBoxLayout()
         
-        extract_btn = QPushButton("提取数字")
-        extract_btn.setFont(QFont(FONT_FAMILY, 12))
-        extract_btn.setFixedHeight(35)
-        extract_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #2196F3;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 0 20px;
-            }
-            QPushButton:hover {
-                background-color: #1976D2;
-            }
-            QPushButton:pressed {
-                background-color: #0D47A1;
-            }
-        """)
+        extract_btn = make_button("提取数字", "primary", 35)
         extract_btn.clicked.connect(self.extract_numbers)
         button_layout.addWidget(extract_btn)
+        self.extract_btn = extract_btn
         
-        cancel_btn = QPushButton("取消")
-        cancel_btn.setFont(QFont(FONT_FAMILY, 12))
-        cancel_btn.setFixedHeight(35)
-        cancel_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #757575;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 0 20px;
-            }
-            QPushButton:hover {
-                background-color: #616161;
-            }
-            QPushButton:pressed {
-                background-color: #424242;
-            }
-        """)
-        cancel_btn.clicked.connect(self.reject)
+        file_btn = make_button("从文件提取", "primary", 35)
+        file_btn.clicked.connect(self.extract_from_file)
+        button_layout.addWidget(file_btn)
+        self.file_btn = file_btn
+        
+        cancel_btn = make_button("取消", "secondary", 35)
+        cancel_btn.clicked.connect(self.on_cancel_clicked)
         button_layout.addWidget(cancel_btn)
         
         layout.addLayout(button_layout)
         
+        # 表格（CSV/TSV）按列求合计
+        table_label = QLabel("表格列合计（CSV/TSV）：")
+        table_label.setFont(get_font(FONT_FAMILY, 12))
+        layout.addWidget(table_label)
+        
+        self.columns_edit = QLineEdit()
+        self.columns_edit.setFont(get_font(FONT_FAMILY, 11))
+        self.columns_edit.setPlaceholderText("要合计的列名或序号，用逗号分隔，留空为所有列")
+        layout.addWidget(self.columns_edit)
+        
+        self.group_edit = QLineEdit()
+        self.group_edit.setFont(get_font(FONT_FAMILY, 11))
+        self.group_edit.setPlaceholderText("分组列（可选）")
+        layout.addWidget(self.group_edit)
+        
+        table_btn = make_button("从表格计算合计", "primary", 35)
+        table_btn.clicked.connect(self.totals_from_file)
+        layout.addWidget(table_btn)
+        self.table_btn = table_btn
+        
+        # 提取进度，提取过程中显示
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(6)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+        
         # 提示文本
         hint = QLabel("提示：将自动提取文本中的所有数字并用加号连接")
-        hint.setFont(QFont(FONT_FAMILY, 10))
-        hint.setStyleSheet("color: #666;")
+        hint.setFont(get_font(FONT_FAMILY, 10))
+        hint.setProperty("hint", True)
         layout.addWidget(hint)
         
-        self.result = None
+        # 提取到的数字，直接交给计算器求和，不再转换为文本
+        self.numbers = None
+        
+        # 表格各列的合计（TableTotals）
+        self.totals = None
+        
+        # 正在进行的提取任务
+        self.worker = None
     
     def updateGeometry(self):
         """更新对话框的位置和大小"""
@@ -212,40 +568,276 @@ class NumberExtractorDialog(QDialog):
         event.ignore()
     
     def extract_numbers(self):
-        try:
-            text = self.input_area.toPlainText().strip()
-            if not text:
-                QMessageBox.warning(self, "提示", "请输入文本")
-                return
-            
-            numbers = []
-            current_num = ""
-            
-            for char in text:
-                if char.isdigit():
-                    current_num += char
-                else:
-                    if current_num:
-                        numbers.append(int(current_num))
-                        current_num = ""
-            
-            if current_num:
-                numbers.append(int(current_num))
-            
-            if not numbers:
-                QMessageBox.information(self, "提示", "未找到数字")
-                return
-            
-            formatted_numbers = [f"{num:,}" for num in numbers]
-            self.result = " + ".join(formatted_numbers)
-            self.accept()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"提取数字时出错：{str(e)}")
+        """在后台线程中提取输入文本中的数字"""
+        text = self.input_area.toPlainText().strip()
+        if not text:
+            QMessageBox.warning(self, "提示", "请输入文本")
+            return
+        self.start_worker(ExtractWorker(text=text))
+    
+    def extract_from_file(self):
+        """在后台线程中提取文件中的数字，文件很大时也不会一次读入内存"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择文件", "", "所有文件 (*)")
+        if not path:
+            return
+        self.start_worker(ExtractWorker(path=path))
+    
+    def totals_from_file(self):
+        """在后台线程中逐行读取表格，计算指定列（可以按分组列分组）的合计"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择表格", "", "表格 (*.csv *.tsv *.txt);;所有文件 (*)")
+        if not path:
+            return
+        columns = [spec for spec in self.columns_edit.text().replace('，', ',').split(',')
+                   if spec.strip()]
+        group_by = self.group_edit.text().strip() or None
+        self.start_worker(ColumnTotalsWorker(path, columns, group_by),
+                          self.on_totals_finished)
+    
+    def start_worker(self, worker, on_finished=None):
+        """启动提取任务，提取过程中只保留取消按钮可用"""
+        self.worker = worker
+        worker.signals.progress.connect(self.progress_bar.setValue)
+        worker.signals.finished.connect(on_finished or self.on_extract_finished)
+        worker.signals.failed.connect(self.on_extract_failed)
+        worker.signals.cancelled.connect(self.on_extract_stopped)
+        
+        self.extract_btn.setEnabled(False)
+        self.file_btn.setEnabled(False)
+        self.table_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        QThreadPool.globalInstance().start(worker)
+    
+    def on_extract_stopped(self):
+        """提取任务结束后恢复按钮"""
+        self.worker = None
+        self.extract_btn.setEnabled(True)
+        self.file_btn.setEnabled(True)
+        self.table_btn.setEnabled(True)
+        self.progress_bar.hide()
+    
+    def on_extract_finished(self, numbers):
+        self.on_extract_stopped()
+        if not numbers:
+            QMessageBox.information(self, "提示", "未找到数字")
+            return
+        
+        self.numbers = numbers
+        self.accept()
+    
+    def on_totals_finished(self, totals):
+        self.on_extract_stopped()
+        if not totals.items():
+            QMessageBox.information(self, "提示", "所选的列中没有数字")
+            return
+        
+        self.totals = totals
+        self.accept()
+    
+    def on_extract_failed(self, message):
+        self.on_extract_stopped()
+        QMessageBox.critical(self, "错误", f"提取数字时出错：{message}")
+    
+    def on_cancel_clicked(self):
+        """提取过程中取消提取，否则关闭对话框"""
+        if self.worker:
+            self.worker.cancel()
+        else:
+            self.reject()
+    
+    def reject(self):
+        if self.worker:
+            self.worker.cancel()
+        super().reject()
+
+class HistoryModel(QAbstractListModel):
+    """历史记录列表，每行显示“表达式 = 结果”，悬停时显示计算时间"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = entries
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            expression = entry.expression + (" …" if entry.truncated else "")
+            return f"{expression} = {entry.result}"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.created))
+        return None
+
+
+class HistoryDialog(QDialog):
+    """搜索历史记录，双击一条记录重新计算"""
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("历史记录")
+        self.resize(480, 520)
+        self.history = history
+        self.selected = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(10)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("输入数字或表达式片段搜索")
+        self.search_box.setProperty("box", True)
+        self.search_box.setFont(get_font(MONO_FONT_FAMILY, 12))
+        self.search_box.textChanged.connect(self.search)
+        layout.addWidget(self.search_box)
+
+        self.model = HistoryModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setProperty("box", True)
+        self.list_view.setFont(get_font(MONO_FONT_FAMILY, 11))
+        self.list_view.doubleClicked.connect(self.on_double_clicked)
+        layout.addWidget(self.list_view)
+
+        hint = QLabel("提示：双击一条记录重新计算")
+        hint.setFont(get_font(FONT_FAMILY, 10))
+        hint.setProperty("hint", True)
+        layout.addWidget(hint)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.selected = None
+        self.search(self.search_box.text())
+        self.search_box.setFocus()
+
+    def search(self, text):
+        self.model.set_entries(self.history.search(text))
+
+    def on_double_clicked(self, index):
+        self.selected = self.model.entries[index.row()]
+        self.accept()
+
+
+class TraceModel(QAbstractListModel):
+    """计算过程列表
+
+    只保存每一步的 (左值, 运算符, 右值, 结果)，不预先生成文本；
+    QListView 只对可见的行调用 data，所以格式化的开销与步骤总数无关。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.multiply_steps = []
+        self.add_steps = []
+        self.add_start = 0  # 加减运算部分的起始行
+        self.row_count = 0
+
+    def set_steps(self, multiply_steps, add_steps):
+        """设置新的计算步骤"""
+        self.beginResetModel()
+        self.multiply_steps = multiply_steps or []
+        self.add_steps = add_steps or []
+        # 乘除部分：标题 + 步骤 + 空行
+        self.add_start = len(self.multiply_steps) + 2 if self.multiply_steps else 0
+        if self.add_steps:
+            self.row_count = self.add_start + len(self.add_steps) + 1
+        else:
+            self.row_count = len(self.multiply_steps) + 1 if self.multiply_steps else 0
+        self.endResetModel()
+
+    def clear(self):
+        self.set_steps([], [])
+
+    def rowCount(self, parent=QModelIndex()):
+        # 视图会频繁调用，行数在 set_steps 中预先算好
+        return 0 if parent.isValid() else self.row_count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+
+        row = index.row()
+        if self.multiply_steps and row < self.add_start:
+            if row == 0:
+                return "乘除运算："
+            if row > len(self.multiply_steps):
+                return ""  # 乘除运算和加减运算之间的空行
+            left, op, right, result = self.multiply_steps[row - 1]
+            return f"{format_number(left)} {op} {right:,} = {format_number(result)}"
+
+        row -= self.add_start
+        if row == 0:
+            return "加减运算："
+        left, op, right, result = self.add_steps[row - 1]
+        return f"{format_number(left)} {op} {format_number(right)} = {format_number(result)}"
+
+
+class LatencyOverlay(QLabel):
+    """按快捷键显示在主窗口上的延迟统计（调试用）"""
+
+    def __init__(self, recorder, parent):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.setFont(get_font(MONO_FONT_FAMILY, 9))
+        self.setObjectName("latencyOverlay")
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.hide()
+
+        # 显示时每 500 毫秒刷新一次
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        QShortcut(QKeySequence(LATENCY_OVERLAY_SHORTCUT), parent, self.toggle)
+
+    def toggle(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start()
+
+    def refresh(self):
+        self.setText(self.recorder.report() or "暂无数据")
+        self.adjustSize()
+        self.move(10, 10)
+
+
+class PasteHandlerMixin:
+    """粘贴（和拖放）的文本先交给 paste_handler，返回 True 时不再按默认方式插入"""
+    paste_handler = None
+
+    def insertFromMimeData(self, source):
+        if source.hasText() and self.paste_handler and self.paste_handler(source.text()):
+            return
+        super().insertFromMimeData(source)
+
+
+class InputTextEdit(PasteHandlerMixin, QTextEdit):
+    pass
+
+
+class LargeInputTextEdit(PasteHandlerMixin, QPlainTextEdit):
+    pass
+
 
 class CalculatorQt(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None, history=None):
         super().__init__()
+        install_app_style()
+        if profiler:
+            profiler.mark("样式表")
         self.setWindowTitle("数字计算器")
         self.setMinimumSize(500, 600)  # 减小最小尺寸
         self.resize(500, 600)          # 设置初始大小
@@ -268,56 +860,22 @@ class CalculatorQt(QMainWindow):
 
         # 标题
         title = QLabel("数字计算器")
-        title.setFont(QFont(FONT_FAMILY, 24, QFont.Weight.Bold))
+        title.setFont(get_font(FONT_FAMILY, 24, bold=True))
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
 
         # 输入区域
         input_label = QLabel("请输入要计算的数字")
-        input_label.setFont(QFont(FONT_FAMILY, 12))
+        input_label.setFont(get_font(FONT_FAMILY, 12))
         layout.addWidget(input_label)
 
-        self.input_area = QTextEdit()
-        self.input_area.setFont(QFont("Consolas", 14))
-        self.input_area.setFixedHeight(120)
-        self.input_area.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid #ddd;
-                background-color: white;
-                padding: 8px;
-                margin-bottom: 20px;  /* 增加底部边距到20px */
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #f5f5f5;
-                width: 8px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: rgba(0, 0, 0, 0.2);
-                min-height: 20px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: rgba(0, 0, 0, 0.3);
-            }
-            QScrollBar::handle:vertical:pressed {
-                background: rgba(0, 0, 0, 0.4);
-            }
-            QScrollBar::add-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        self.input_area = self.create_input_area()
+        self.large_document = False
         layout.addWidget(self.input_area)
 
         # 在输入区域之后，创建一个按钮容器
         button_container = QWidget()
+        button_container.setObjectName("buttonContainer")
         button_container_layout = QVBoxLayout(button_container)
         button_container_layout.setContentsMargins(0, 0, 0, 0)  # 移除容器的内边距
         button_container_layout.setSpacing(5)  # 减小按钮组之间的间距
@@ -330,26 +888,7 @@ class CalculatorQt(QMainWindow):
         self.operator_buttons = []  # 保存运算符按钮的引用
         
         for operator in operators:
-            btn = QPushButton(operator)
-            btn.setFont(QFont(FONT_FAMILY, 12))
-            btn.setFixedHeight(40)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #2196F3;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background-color: #1976D2;
-                }
-                QPushButton:pressed {
-                    background-color: #0D47A1;
-                }
-                QPushButton:focus {
-                    outline: none;
-                }
-            """)
+            btn = make_button(operator, "primary", 40)
             btn.clicked.connect(lambda checked, op=operator: self.add_operator(op))
             operator_layout.addWidget(btn)
             self.operator_buttons.append(btn)  # 将按钮添加到列表中
@@ -360,100 +899,61 @@ class CalculatorQt(QMainWindow):
         button_layout.setSpacing(8)  # 设置功能按钮之间的间距
         button_layout.setContentsMargins(0, 0, 0, 0)  # 移除功能按钮区域的边距
         buttons = [
-            ("提取数字", "#9C27B0", self.extract_numbers),
-            ("清除", "#F44336", self.clear),
-            ("计算结果", "#4CAF50", self.calculate)
+            ("提取数字", "extract", self.extract_numbers),
+            ("历史记录", "secondary", self.open_history),
+            ("清除", "clear", self.clear),
+            ("计算结果", "calculate", self.calculate)
         ]
-        for text, color, func in buttons:
-            btn = QPushButton(text)
-            btn.setFont(QFont(FONT_FAMILY, 12))
-            btn.setFixedHeight(40)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color};
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                }}
-                QPushButton:hover {{
-                    background-color: {color}dd;
-                }}
-                QPushButton:pressed {{
-                    background-color: {color}aa;
-                }}
-            """)
+        for text, kind, func in buttons:
+            btn = make_button(text, kind, 40)
             btn.clicked.connect(func)
             button_layout.addWidget(btn)
+        
+        # 打开后自动对复制的文本求和，不需要粘贴
+        self.clipboard_btn = make_button("监视剪贴板", "secondary", 40)
+        self.clipboard_btn.setCheckable(True)
+        self.clipboard_btn.toggled.connect(self.set_clipboard_watch)
+        button_layout.addWidget(self.clipboard_btn)
         button_container_layout.addLayout(button_layout)
-
-        # 将���钮容器添加到主布局时设置固定的上边距
-        button_container.setStyleSheet("""
-            QWidget {
-                margin-top: 10px;  /* 给按钮容器添加上边距 */
-            }
-        """)
         layout.addWidget(button_container)
 
         # 结果显示区域
         result_label = QLabel("计算结果")
-        result_label.setFont(QFont(FONT_FAMILY, 12))
+        result_label.setFont(get_font(FONT_FAMILY, 12))
         layout.addWidget(result_label)
 
         self.result_display = QLineEdit()
-        self.result_display.setFont(QFont("Consolas", 14))
+        self.result_display.setProperty("box", True)
+        self.result_display.setFont(get_font(MONO_FONT_FAMILY, 14))
         self.result_display.setReadOnly(True)
-        self.result_display.setStyleSheet("""
-            QLineEdit {
-                border: 1px solid #ddd;
-                background-color: white;
-                padding: 8px;
-            }
-        """)
         layout.addWidget(self.result_display)
 
+        # 监视剪贴板时显示最近一次复制的文本中数字的合计
+        self.clipboard_display = QLabel()
+        self.clipboard_display.setFont(get_font(FONT_FAMILY, 10))
+        self.clipboard_display.setProperty("hint", True)
+        self.clipboard_display.hide()
+        layout.addWidget(self.clipboard_display)
+
         # 计算过程显示区域
         process_label = QLabel("计算过程")
-        process_label.setFont(QFont(FONT_FAMILY, 12))
+        process_label.setFont(get_font(FONT_FAMILY, 12))
         layout.addWidget(process_label)
 
-        self.process_display = QTextEdit()
-        self.process_display.setFont(QFont("Consolas", 11))  # 减小字号
+        # 计算过程只格式化可见的行，步骤再多也不会卡顿
+        self.trace_model = TraceModel(self)
+        self.process_display = QListView()
+        self.process_display.setModel(self.trace_model)
+        self.process_display.setUniformItemSizes(True)
+        # 分批布局，步骤很多时也不会阻塞界面
+        self.process_display.setLayoutMode(QListView.LayoutMode.Batched)
+        self.process_display.setBatchSize(2000)
+        self.process_display.setObjectName("processDisplay")
+        self.process_display.setProperty("box", True)
+        self.process_display.setFont(get_font(MONO_FONT_FAMILY, 11))  # 减小字号
         self.process_display.setFixedHeight(100)  # 调整高度
-        self.process_display.setReadOnly(True)
-        self.process_display.setStyleSheet("""
-            QTextEdit {
-                border: 1px solid #ddd;
-                background-color: white;
-                padding: 8px;
-                margin-bottom: 5px;  /* 减小底部边距到5px */
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #f5f5f5;
-                width: 8px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: rgba(0, 0, 0, 0.2);
-                min-height: 20px;
-                border-radius: 4px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: rgba(0, 0, 0, 0.3);
-            }
-            QScrollBar::handle:vertical:pressed {
-                background: rgba(0, 0, 0, 0.4);
-            }
-            QScrollBar::add-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        self.process_display.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.process_display.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         layout.addWidget(self.process_display)
 
         # 提示文本
@@ -469,8 +969,8 @@ class CalculatorQt(QMainWindow):
 
         for hint in hints:
             hint_label = QLabel(hint)
-            hint_label.setFont(QFont(FONT_FAMILY, 10))
-            hint_label.setStyleSheet("color: #666;")
+            hint_label.setFont(get_font(FONT_FAMILY, 10))
+            hint_label.setProperty("hint", True)
             hint_layout.addWidget(hint_label)
 
         layout.addWidget(hint_container)
@@ -478,18 +978,176 @@ class CalculatorQt(QMainWindow):
         # 设置窗口居中
         self.center_window()
 
-        # 绑定车键
-        self.input_area.installEventFilter(self)
-
-        # 改用 textEdited 信号
-        self.input_area.textChanged.connect(self.on_text_changed)
-
         # 添加一个标志位来防止递归
         self.is_formatting = False
 
+        # 最近一次编辑的区域 (起始位置, 结束位置)
+        self.pending_edit = None
+
+        # 撤销和重做；edit_capture 为编辑前光标附近的文本 (起始位置, 文本)
+        self.edit_history = EditHistory()
+        self.edit_capture = None
+
         # 添加一个变量来跟踪上一次按下Backspace的时间
         self.last_backspace_time = 0
 
+        # 从提取数字对话框直接传入的数字（数量太多、输入框只显示一部分时使用）
+        self.extracted_numbers = None
+
+        # 输入时的实时合计
+        self.running_total = RunningTotal()
+
+        # 在中间修改后，合并一段时间内的编辑，再交给后台线程重新计算
+        self.live_generation = 0
+        self.live_worker = None
+        self.live_pool = QThreadPool(self)
+        self.live_pool.setMaxThreadCount(1)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_RESULT_DELAY_MS)
+        self.live_timer.timeout.connect(self.start_live_worker)
+
+        # 计算结果缓存，连续按 Enter 或只追加了几项时不必从头计算
+        self.result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, trace=True)
+        self.last_calculation = None
+
+        # 提取数字面板在第一次使用时才创建，之后重复使用
+        self.extractor_dialog = None
+
+        # 监视剪贴板：最近内容的合计按哈希值保存，重复复制时不再计算；
+        # clipboard_key 为正在显示或正在计算的内容的哈希值
+        self.clipboard_results = RecentPayloads()
+        self.clipboard_worker = None
+        self.clipboard_key = None
+
+        # 计算历史（没有启用时为 None），历史记录面板也在第一次使用时创建
+        self.history = history
+        self.history_dialog = None
+        QShortcut(QKeySequence(HISTORY_SHORTCUT), self, self.open_history)
+
+        if profiler:
+            profiler.mark("构建主窗口")
+
+    def create_input_area(self, large=False):
+        """创建输入框，大文档模式使用 QPlainTextEdit"""
+        input_area = LargeInputTextEdit() if large else InputTextEdit()
+        input_area.paste_handler = self.paste_text
+        input_area.setObjectName("inputArea")
+        input_area.setProperty("box", True)
+        input_area.setFont(get_font(MONO_FONT_FAMILY, 14))
+        input_area.setFixedHeight(120)
+        # 撤销和重做由 edit_history 处理，格式化后仍然可以撤销
+        input_area.setUndoRedoEnabled(False)
+
+        # 绑定回车键
+        input_area.installEventFilter(self)
+        # 鼠标点击移动光标时结束连续输入
+        input_area.viewport().installEventFilter(self)
+
+        # 改用 textEdited 信号
+        input_area.textChanged.connect(self.on_text_changed)
+        # 记录每次编辑的位置，只格式化被编辑的区域
+        input_area.document().contentsChange.connect(self.on_contents_change)
+        return input_area
+
+    def set_large_document(self, enabled):
+        """切换大文档模式，用新的输入框替换当前输入框
+
+        大文档模式下文本在运算符后分行，换行符代替原来的空格，
+        所以文本长度和光标位置都不变。
+        """
+        if enabled == self.large_document:
+            return
+        old = self.input_area
+        text = old.toPlainText()
+        cursor_pos = old.textCursor().position()
+        had_focus = old.hasFocus()
+
+        new = self.create_input_area(enabled)
+        new.setReadOnly(old.isReadOnly())
+        formatting, self.is_formatting = self.is_formatting, True
+        if enabled:
+            new.setPlainText(wrap_lines(text, LARGE_DOCUMENT_LINE_CHARS))
+        else:
+            new.setPlainText(text.replace('\n', ' '))
+        self.is_formatting = formatting
+        cursor = new.textCursor()
+        cursor.setPosition(min(cursor_pos, len(text)))
+        new.setTextCursor(cursor)
+
+        old.parentWidget().layout().replaceWidget(old, new)
+        self.input_area = new
+        self.large_document = enabled
+        old.removeEventFilter(self)
+        old.blockSignals(True)
+        old.document().blockSignals(True)
+        old.deleteLater()
+        if had_focus:
+            new.setFocus()
+
+    def wrap_edit(self, position):
+        """大文档模式：编辑位置所在的行太长时重新分行"""
+        document = self.input_area.document()
+        block = document.findBlock(position)
+        if block.length() <= 2 * LARGE_DOCUMENT_LINE_CHARS:
+            return
+        start = block.position()
+        text = block.text()
+        wrapped = wrap_lines(text, LARGE_DOCUMENT_LINE_CHARS)
+        if wrapped == text:
+            return
+
+        cursor_pos = self.input_area.textCursor().position()
+        self.edit_history.record(start, text, wrapped, merge=True)
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        cursor.setPosition(start)
+        cursor.setPosition(start + len(text), QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(wrapped)
+        cursor.endEditBlock()
+        # 分行不改变长度，光标放回原来的位置
+        cursor.setPosition(cursor_pos)
+        self.input_area.setTextCursor(cursor)
+
+    def paste_text(self, text):
+        """粘贴大段文本：整理格式后只插入一次，只格式化与前后文本相接的地方
+
+        文本较短时返回 False，按默认方式插入后由 on_text_changed 处理。
+        """
+        if len(text) < PASTE_FAST_PATH_CHARS:
+            return False
+        if self.input_area.isReadOnly():
+            return True
+
+        formatted = format_paste(text)
+        cursor = self.input_area.textCursor()
+        start, end = cursor.selectionStart(), cursor.selectionEnd()
+        length = self.input_area.document().characterCount() - 1
+        # 粘贴后会进入大文档模式时先切换，避免在 QTextEdit 中布局很长的一行
+        if length - (end - start) + len(formatted) > LARGE_DOCUMENT_CHARS:
+            self.set_large_document(True)
+        if self.large_document:
+            formatted = wrap_lines(formatted, LARGE_DOCUMENT_LINE_CHARS)
+
+        self.is_formatting = True
+        self.edit_history.record(start, self.text_range(start, end), formatted)
+        cursor = self.input_area.textCursor()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(formatted)
+        self.input_area.setTextCursor(cursor)
+
+        # 先处理后面相接的地方，不影响前面的位置
+        end = start + len(formatted)
+        self.format_edit(end, end)
+        self.format_edit(start, start)
+        if self.large_document:
+            self.wrap_edit(start)
+        self.update_live_result((start, end))
+        self.is_formatting = False
+        self.input_area.ensureCursorVisible()
+        return True
+
     def center_window(self):
         """将窗口居中显示"""
         screen = QApplication.primaryScreen().geometry()
@@ -499,7 +1157,21 @@ class CalculatorQt(QMainWindow):
         self.move(x, y)
 
     def eventFilter(self, obj, event):
+        if obj == self.input_area.viewport() and event.type() == event.Type.MouseButtonPress:
+            self.edit_history.end_typing()
+        if obj == self.input_area and event.type() in (
+                event.Type.InputMethod, event.Type.Drop, event.Type.ContextMenu):
+            # 输入法、拖放和右键菜单的编辑也先记录光标附近的文本
+            self.capture_selection()
         if obj == self.input_area and event.type() == event.Type.KeyPress:
+            # 撤销和重做
+            if event.matches(QKeySequence.StandardKey.Undo):
+                self.undo()
+                return True
+            if event.matches(QKeySequence.StandardKey.Redo):
+                self.redo()
+                return True
+
             # 处理回车键
             if event.key() == Qt.Key.Key_Return and not event.modifiers():
                 self.calculate()
@@ -523,22 +1195,26 @@ class CalculatorQt(QMainWindow):
             
             # 处理Backspace键
             if event.key() == Qt.Key.Key_Backspace:
-                text = self.input_area.toPlainText().strip()
-                parts = text.split()
-                
-                # 如果没有内容，直接返回
-                if not parts:
-                    return False
+                # 只查看末尾的字符，不读取整段文本
+                document = self.input_area.document()
+                end = document.characterCount() - 1
+                position = end
+                while position > 0 and document.characterAt(position - 1).isspace():
+                    position -= 1
                     
                 # 如果最后一个是运算符，检查是否是双击Backspace
-                if parts[-1] in ['+', '-', '×', '÷']:
+                if position > 0 and document.characterAt(position - 1) in OPERATORS:
                     current_time = time.time()
                     if current_time - self.last_backspace_time < 0.3:  # 300毫秒内的双击
-                        parts = parts[:-1]
-                        new_text = ' '.join(parts)
-                        if new_text:
-                            new_text += ' '  # 如果还有内容，添加一个空格
-                        self.input_area.setPlainText(new_text)
+                        # 删除最后一个运算符和它前后的空白
+                        start = position - 1
+                        while start > 0 and document.characterAt(start - 1).isspace():
+                            start -= 1
+                        self.capture_range(start, end)
+                        cursor = QTextCursor(document)
+                        cursor.setPosition(start)
+                        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                        cursor.insertText(' ' if start else '')  # 如果还有内容，添加一个空格
                         
                         # 设置焦点并将光标移到末尾
                         self.input_area.setFocus()
@@ -550,31 +1226,46 @@ class CalculatorQt(QMainWindow):
                     self.last_backspace_time = current_time
                     return True  # 拦截第一次按下的Backspace
                 else:
-                    self.last_backspace_time = 0  # 如果不是运算符，重置时间
-                    return False  # 让系统处理普通的删除操作
+                    self.last_backspace_time = 0  # 如果没有内容或不是运算符，重置时间
+            
+            # 方向键等移动光标后的输入另起一步撤销
+            if event.key() in NAVIGATION_KEYS:
+                self.edit_history.end_typing()
+            
+            # 其他按键交给输入框处理，先记录可能被删除的文本
+            self.capture_selection()
             
         return super().eventFilter(obj, event)
 
     def add_operator(self, operator):
         """添加运算符"""
+        if self.input_area.isReadOnly():
+            return
         try:
-            text = self.input_area.toPlainText().strip()
-            parts = text.split()
+            # 只查看末尾的字符，不读取整段文本
+            document = self.input_area.document()
+            end = document.characterCount() - 1
+            position = end
+            while position > 0 and document.characterAt(position - 1).isspace():
+                position -= 1
             
             # 如果没有内容，不添加运算符
-            if not parts:
+            if position == 0:
                 return
             
+            cursor = QTextCursor(document)
+            last_char = document.characterAt(position - 1)
+            self.capture_range(position - 1, end)
             # 如果最后一个是运算符，直接替换
-            if parts[-1] in ['+', '-', '×', '÷']:
-                parts[-1] = operator
+            if last_char in OPERATORS:
+                cursor.setPosition(position - 1)
+                cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(f"{operator} ")
             # 如果最后一个是数字，添加运算符
-            elif parts[-1].replace(',', '').isdigit():
-                parts.append(operator)
-            
-            # 更新显示
-            new_text = ' '.join(parts) + ' '
-            self.input_area.setPlainText(new_text)
+            elif last_char.isdigit():
+                cursor.setPosition(position)
+                cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(f" {operator} ")
             
             # 设置焦点并将光标移到末尾
             self.input_area.setFocus()
@@ -586,13 +1277,224 @@ class CalculatorQt(QMainWindow):
             print(f"Add operator error: {str(e)}")
             pass
 
+    def on_contents_change(self, position, removed, added):
+        """记录被编辑的区域，由 on_text_changed 进行增量格式化"""
+        if self.is_formatting:
+            return
+        self.record_edit(position, removed, added)
+        if self.pending_edit:
+            # 同一次变化中的多处编辑，合并为一个区域
+            start, end = self.pending_edit
+            if position <= end:
+                end = max(end + added - removed, position + added)
+            else:
+                end = position + added
+            self.pending_edit = (min(start, position), end)
+        else:
+            self.pending_edit = (position, position + added)
+
+    def capture_selection(self):
+        """编辑前记录选中的文本和光标附近的文本"""
+        cursor = self.input_area.textCursor()
+        length = self.input_area.document().characterCount() - 1
+        self.capture_range(max(0, cursor.selectionStart() - UNDO_CAPTURE_MARGIN),
+                           min(length, cursor.selectionEnd() + UNDO_CAPTURE_MARGIN))
+
+    def capture_range(self, start, end):
+        self.edit_capture = (start, self.text_range(start, end))
+
+    def record_edit(self, position, removed, added):
+        """把输入框的一次编辑记入撤销历史，被删除的文本从编辑前记录的文本中取得"""
+        capture, self.edit_capture = self.edit_capture, None
+        if position + added > self.input_area.document().characterCount() - 1:
+            # 整段替换时 Qt 报告的长度包含段落结束符，无法对应到文本
+            self.edit_history.clear()
+            return
+        if removed == 0:
+            removed_text = ""
+        elif capture and capture[0] <= position and position + removed <= capture[0] + len(capture[1]):
+            offset = position - capture[0]
+            removed_text = capture[1][offset:offset + removed]
+        else:
+            # 不知道删除了什么，之前的步骤无法再撤销
+            self.edit_history.clear()
+            return
+        inserted = self.text_range(position, position + added)
+        # 连续输入的数字合并为一步，运算符单独为一步
+        self.edit_history.record(position, removed_text, inserted,
+                                 typing=removed == 0 and inserted.isdigit() and added == 1)
+
+    def undo(self):
+        if not self.input_area.isReadOnly():
+            self.apply_edits(self.edit_history.undo())
+
+    def redo(self):
+        if not self.input_area.isReadOnly():
+            self.apply_edits(self.edit_history.redo())
+
+    def apply_edits(self, edits):
+        """执行撤销或重做得到的替换，不再格式化，也不记入撤销历史"""
+        if not edits:
+            return
+        self.is_formatting = True
+        cursor = QTextCursor(self.input_area.document())
+        cursor.beginEditBlock()
+        for position, length, text in edits:
+            cursor.setPosition(position)
+            cursor.setPosition(position + length, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(text)
+        cursor.endEditBlock()
+        self.input_area.setTextCursor(cursor)
+        self.pending_edit = None
+        low = min(position for position, _, _ in edits)
+        self.update_live_result((low, low))
+        self.is_formatting = False
+
     def on_text_changed(self):
         """处理文本变化事件"""
         if not self.is_formatting:
             self.is_formatting = True
-            self.format_input()
+            edit, self.pending_edit = self.pending_edit, None
+            if edit:
+                self.format_edit(*edit)
+                if self.large_document:
+                    self.wrap_edit(edit[0])
+            elif not self.large_document:
+                self.format_input()
+            # 文本变长或变短后切换大文档模式（切换会替换输入框）
+            length = self.input_area.document().characterCount() - 1
+            if length > LARGE_DOCUMENT_CHARS:
+                self.set_large_document(True)
+            elif length < LARGE_DOCUMENT_CHARS // 2:
+                self.set_large_document(False)
+            self.update_live_result(edit)
             self.is_formatting = False
 
+    def update_live_result(self, edit):
+        """输入时实时显示结果：在末尾追加时只计算新增的部分，其他修改在后台重新计算"""
+        self.cancel_live_worker()
+        running = self.running_total
+        document = self.input_area.document()
+        length = document.characterCount() - 1
+
+        def is_tail_edit():
+            # 编辑发生在最后一个运算符之后，且该运算符没有被格式化替换
+            committed = running.committed_length
+            return (edit and edit[0] >= committed and committed <= length and running.valid
+                    and length - committed <= LIVE_TAIL_CHARS
+                    and (committed == 0
+                         or document.characterAt(committed - 1) == running.pending_op))
+
+        # 最后一个运算符被删除时，退回到上一个运算符
+        if is_tail_edit() or running.rollback() and is_tail_edit():
+            self.show_live_value(running.update_tail(
+                self.text_range(running.committed_length, length)))
+            return
+
+        # 在界面线程中不重新计算整段文本，停止输入后交给后台线程
+        running.reset()
+        running.valid = False
+        self.result_display.clear()
+        self.live_timer.start()
+
+    def cancel_live_worker(self):
+        """新的编辑使之前的实时结果任务过期"""
+        self.live_generation += 1
+        self.live_timer.stop()
+        if self.live_worker is not None:
+            self.live_worker.cancel()
+            # 还没有开始运行的任务直接从线程池中移除
+            self.live_pool.tryTake(self.live_worker)
+            self.live_worker = None
+
+    def stop_workers(self):
+        """退出前取消并等待所有后台任务，任务结束时不会再向已经删除的信号对象发送信号"""
+        self.cancel_live_worker()
+        self.cancel_clipboard_worker()
+        dialog = self.extractor_dialog
+        if dialog is not None and dialog.worker is not None:
+            dialog.worker.cancel()
+        self.live_pool.waitForDone()
+        QThreadPool.globalInstance().waitForDone()
+
+    def start_live_worker(self):
+        """提交当前文本的快照，在后台重新计算实时合计"""
+        if self.extracted_numbers is not None:
+            return
+        worker = LiveResultWorker(self.live_generation, self.input_area.toPlainText())
+        worker.signals.finished.connect(self.on_live_result)
+        self.live_worker = worker
+        self.live_pool.start(worker)
+
+    def on_live_result(self, generation, running, value):
+        """后台计算完成，只采用最新一次编辑的结果"""
+        if generation != self.live_generation:
+            return
+        self.live_worker = None
+        self.running_total = running
+        self.show_live_value(value)
+
+    def show_live_value(self, value):
+        """显示实时结果，无法计算时清空"""
+        if value is None:
+            self.result_display.clear()
+        else:
+            self.result_display.setText(f"= {format_number(value)}")
+
+    def format_edit(self, start, end):
+        """增量格式化：只重新格式化编辑区域附近的数字和运算符"""
+        try:
+            cursor = self.input_area.textCursor()
+            cursor_pos = cursor.position()
+            length = self.input_area.document().characterCount() - 1
+
+            # 只读取编辑位置附近的文本，不够时逐步扩大范围
+            margin = 64
+            while True:
+                low = max(0, start - margin)
+                high = min(length, end + margin)
+                window = self.text_range(low, high)
+                region_start, region_end, replacement = format_region(
+                    window, start - low, end - low)
+                if ((region_start > 0 or low == 0)
+                        and (region_end < len(window) or high == length)):
+                    break
+                margin *= 4
+
+            region = window[region_start:region_end]
+            start, end = low + region_start, low + region_end
+            if replacement == region:
+                return
+
+            # 只替换变化的区域，不重新设置整段文本
+            self.edit_history.record(start, region, replacement, merge=True)
+            cursor.beginEditBlock()
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(replacement)
+            cursor.endEditBlock()
+
+            # 保持光标在原来的数字或运算符之后
+            if cursor_pos < start:
+                new_pos = cursor_pos
+            elif cursor_pos > end:
+                new_pos = cursor_pos + len(replacement) - len(region)
+            else:
+                new_pos = start + map_cursor(region, cursor_pos - start, replacement)
+            cursor.setPosition(new_pos)
+            self.input_area.setTextCursor(cursor)
+
+        except Exception as e:
+            print(f"Format error: {str(e)}")
+            pass
+
+    def text_range(self, start, end):
+        """读取输入框中 [start, end) 范围的纯文本"""
+        cursor = QTextCursor(self.input_area.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        return cursor.selectedText().replace('\u2029', '\n')
+
     def format_input(self):
         """格式化输入内容"""
         try:
@@ -601,43 +1503,8 @@ class CalculatorQt(QMainWindow):
             if not text:
                 return
 
-            # 处理键入的 * 和 / 转换为 × 和 ÷
-            text = text.replace('*', '×').replace('/', '÷')
-            
-            # 规范化运算符前后的空格
-            for op in ['+', '-', '×', '÷']:
-                text = text.replace(f' {op} ', op)  # 先移除已有的空格
-                text = text.replace(op, f' {op} ')  # 再统一添加空格
-            
-            # 移除多余的空格和逗号
-            parts = text.split()
-            formatted_parts = []
-            
-            for part in parts:
-                # 移除逗号
-                part = part.replace(',', '')
-                
-                # 如果是运算符
-                if part in ['+', '-', '×', '÷']:
-                    # 如果已经有内容且最后一个不是运算符，添加运算符
-                    if formatted_parts and not formatted_parts[-1] in ['+', '-', '×', '÷']:
-                        formatted_parts.append(part)
-                    # 如果最后一个是运算符，直接替换
-                    elif formatted_parts and formatted_parts[-1] in ['+', '-', '×', '÷']:
-                        formatted_parts[-1] = part
-                # 如果是数字
-                elif part.isdigit():
-                    formatted_parts.append(f"{int(part):,}")
-            
-            # 组合格式化后的文本
-            formatted_text = ' '.join(formatted_parts)
-            
-            # 如果最后一个字符是运算符，确保它后面有一个空格
-            if formatted_text and formatted_text[-1] in ['+', '-', '×', '÷']:
-                formatted_text += ' '
-            
             # 更新显示
-            self.input_area.setPlainText(formatted_text)
+            self.input_area.setPlainText(format_expression(text))
             
             # 设置焦点并将光标移到末尾
             self.input_area.setFocus()
@@ -651,122 +1518,329 @@ class CalculatorQt(QMainWindow):
 
     def calculate(self):
         """计算结果"""
+        self.edit_history.end_typing()
+        if self.extracted_numbers is not None:
+            # 输入框中只显示了部分数字，直接使用提取到的数字
+            self.trace_model.set_steps([], self.extracted_numbers)
+            self.result_display.setText(f"= {format_number(self.extracted_numbers.total())}")
+            return
+        
         try:
-            expression = self.input_area.toPlainText().strip()
-            
-            # 移除所有空格和逗号
-            expression = expression.replace(" ", "").replace(",", "")
-            
-            # 分割数字和运算符
-            parts = []
-            current_num = ""
-            
-            for char in expression:
-                if char in ['+', '-', '×', '÷']:
-                    if current_num:
-                        parts.append(int(current_num))
-                        current_num = ""
-                    parts.append(char)
-                elif char.isdigit():
-                    current_num += char
-            
-            if current_num:
-                parts.append(int(current_num))
-            
-            # 初始化过程文本
-            process_text = ""
+            text = self.input_area.toPlainText()
+            tokens = tokenize(text)
+            if self.large_document:
+                # 大文档模式不生成计算过程
+                result = evaluate_value(tokens, PARALLEL_THRESHOLD)
+                self.last_calculation = None
+                self.trace_model.clear()
+                self.show_result(text, result)
+                return
+            if len(tokens) >= MIN_VECTOR_TOKENS and tokens.is_sum_chain():
+                # 很长的纯加法：前缀和即计算过程，不经过逐项计算和缓存
+                steps = sum_steps(tokens.operands)
+                self.last_calculation = None
+                self.trace_model.set_steps([], steps)
+                self.show_result(text, steps.total())
+                return
+            if len(tokens) >= PARALLEL_THRESHOLD:
+                # 超长的表达式不生成计算过程，用 NumPy 或多进程计算
+                result = evaluate_value(tokens, PARALLEL_THRESHOLD)
+                self.last_calculation = None
+                self.trace_model.clear()
+                self.show_result(text, result)
+                return
             
-            # 处理乘除法
-            i = 0
-            has_multiply_divide = False
-            while i < len(parts):
-                if isinstance(parts[i], str) and parts[i] in ['×', '÷']:
-                    if not has_multiply_divide:
-                        process_text += "乘除运算：\n"
-                        has_multiply_divide = True
-                    
-                    left = parts[i-1]
-                    right = parts[i+1]
-                    
-                    if parts[i] == '×':
-                        result = left * right
-                        process_text += f"{left:,} × {right:,} = {result:,}\n"
-                    else:  # 除法
-                        if right == 0:
-                            raise ValueError("除数不能为零")
-                        result = left / right
-                        if result.is_integer():
-                            process_text += f"{left:,} ÷ {right:,} = {int(result):,}\n"
-                        else:
-                            process_text += f"{left:,} ÷ {right:,} = {result:.2f}\n"
-                    
-                    parts[i-1:i+2] = [result]
-                    i -= 1
-                i += 1
+            acc = self.result_cache.evaluate(tokens)
+            result = acc.value()
             
-            # 处理加减法
-            if len(parts) > 1:
-                if has_multiply_divide:
-                    process_text += "\n"  # 如果有乘除运算，添加空行
-                process_text += "加减运算：\n"
-                result = parts[0]
-                i = 1
-                while i < len(parts):
-                    if parts[i] == '+':
-                        process_text += f"{result:,} + {parts[i+1]:,} = "
-                        result += parts[i+1]
-                        process_text += f"{result:,}\n"
-                    elif parts[i] == '-':
-                        process_text += f"{result:,} - {parts[i+1]:,} = "
-                        result -= parts[i+1]
-                        process_text += f"{result:,}\n"
-                    i += 2
-            else:
-                result = parts[0]
+            # 与上一次计算的表达式相同时，计算过程不需要重新生成
+            if acc is self.last_calculation:
+                self.show_result(text, result)
+                return
+            self.last_calculation = acc
+            multiply_steps, add_steps = acc.steps()
             
             # 显示计算过程
-            self.process_display.setPlainText(process_text)
+            self.trace_model.set_steps(multiply_steps, add_steps)
             
-            # 显示最终结果
-            if isinstance(result, int) or result.is_integer():
-                result = int(result)
-                self.result_display.setText(f"= {result:,}")
-            else:
-                # 处理小数，保留2位
-                result = round(result, 2)
-                if result == int(result):
-                    self.result_display.setText(f"= {int(result):,}")
-                else:
-                    self.result_display.setText(f"= {result:,.2f}")
+            # 显示最终结果（小数保留2位）
+            self.show_result(text, result)
         
         except ValueError as ve:
             QMessageBox.critical(self, "错误", str(ve))
         except Exception as e:
-            QMessageBox.critical(self, "错误", 
-                "计算出错：请确保输入格式正确\n例如：123 + 456 - 789")
+            QMessageBox.critical(self, "错误", FORMAT_ERROR_MESSAGE)
+
+    def show_result(self, text, result):
+        """显示计算结果并记入历史"""
+        formatted = format_number(result)
+        self.result_display.setText(f"= {formatted}")
+        if self.history is not None:
+            self.history.record(text, formatted)
 
     def clear(self):
-        """清除输入和结果"""
-        self.input_area.clear()
-        self.process_display.clear()
+        """清除输入和结果（可以撤销）"""
+        document = self.input_area.document()
+        if self.extracted_numbers is None:
+            self.capture_range(0, document.characterCount() - 1)
+        self.extracted_numbers = None
+        self.input_area.setReadOnly(False)
+        # 选中全部后删除（而不是 setPlainText），撤销历史中只记录这一次删除
+        cursor = QTextCursor(document)
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.removeSelectedText()
+        self.trace_model.clear()
         self.result_display.clear()
+        self.last_calculation = None
 
     def extract_numbers(self):
-        dialog = NumberExtractorDialog(self)
-        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.result:
-            self.input_area.setPlainText(dialog.result)
-            self.input_area.setFocus()
-            cursor = self.input_area.textCursor()
-            cursor.movePosition(cursor.MoveOperation.End)
-            self.input_area.setTextCursor(cursor)
+        self.open_extractor()
+
+    def extract_from_path(self, path):
+        """打开提取数字面板并提取文件中的数字"""
+        dialog = self.extractor_dialog
+        if dialog is not None and dialog.isVisible():
+            # 面板已经打开，空闲时直接开始提取
+            if dialog.worker is None:
+                dialog.start_worker(ExtractWorker(path=path))
+            return
+        self.open_extractor(path)
+
+    def open_extractor(self, path=None):
+        if self.extractor_dialog is None:
+            self.extractor_dialog = NumberExtractorDialog(self)
+        dialog = self.extractor_dialog
+        dialog.numbers = None
+        dialog.totals = None
+        if path:
+            dialog.start_worker(ExtractWorker(path=path))
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        if dialog.numbers:
+            self.show_numbers(dialog.numbers)
+        elif dialog.totals is not None:
+            self.show_totals(dialog.totals.items())
+
+    def open_history(self):
+        """打开历史记录，选中的表达式放回输入框重新计算"""
+        if self.history is None:
+            QMessageBox.information(self, "提示", "没有启用历史记录")
+            return
+        if self.history_dialog is None:
+            self.history_dialog = HistoryDialog(self.history, self)
+        dialog = self.history_dialog
+        if dialog.exec() != QDialog.DialogCode.Accepted or dialog.selected is None:
+            return
+        entry = dialog.selected
+        if entry.truncated:
+            QMessageBox.information(self, "提示", "表达式太长，历史记录中只保存了开头部分，无法重新计算")
+            return
+        self.clear()
+        self.input_area.insertPlainText(entry.expression)
+        self.calculate()
+
+    def handle_arguments(self, args):
+        """处理启动参数：文件提取其中的数字，其他参数作为表达式计算"""
+        expressions = []
+        for arg in args:
+            if os.path.isfile(arg):
+                self.extract_from_path(arg)
+            else:
+                expressions.append(arg)
+        if expressions:
+            self.clear()
+            self.input_area.insertPlainText(" ".join(expressions))
+            self.calculate()
+
+    def on_instance_message(self, args):
+        """另一个进程转交了参数，把窗口显示到最前面"""
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if args:
+            self.handle_arguments(args)
+
+    def show_numbers(self, numbers):
+        """直接对提取到的数字求和，不经过文本格式化和解析"""
+        self.clear()
+        self.cancel_live_worker()
+        # 提取到的数字不经过输入，不能撤销到这之前
+        self.edit_history.clear()
+        steps = sum_steps(numbers)
+        
+        if len(numbers) <= EXTRACT_DISPLAY_LIMIT:
+            self.is_formatting = True
+            self.input_area.setPlainText(" + ".join(f"{num:,}" for num in numbers))
+            self.running_total.rebuild(self.input_area.toPlainText())
+            self.is_formatting = False
+        else:
+            # 数字太多时只显示前面一部分，输入框只读，计算使用提取到的数字
+            self.extracted_numbers = steps
+            preview = " + ".join(f"{num:,}" for num in numbers[:EXTRACT_DISPLAY_LIMIT])
+            self.is_formatting = True
+            self.input_area.setPlainText(f"{preview} + …（共 {len(numbers):,} 个数字，点击“清除”后可重新输入）")
+            self.is_formatting = False
+            self.input_area.setReadOnly(True)
+        
+        self.trace_model.set_steps([], steps)
+        self.result_display.setText(f"= {format_number(steps.total())}")
+        
+        self.input_area.setFocus()
+        cursor = self.input_area.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        self.input_area.setTextCursor(cursor)
+
+    def set_clipboard_watch(self, enabled):
+        """打开或关闭剪贴板监视"""
+        clipboard = QApplication.clipboard()
+        if enabled:
+            clipboard.dataChanged.connect(self.on_clipboard_changed)
+            self.clipboard_display.setText("剪贴板：复制文本后自动求和")
+            self.clipboard_display.show()
+        else:
+            clipboard.dataChanged.disconnect(self.on_clipboard_changed)
+            self.cancel_clipboard_worker()
+            self.clipboard_key = None
+            self.clipboard_display.hide()
+
+    def cancel_clipboard_worker(self):
+        if self.clipboard_worker is not None:
+            self.clipboard_worker.cancel()
+            QThreadPool.globalInstance().tryTake(self.clipboard_worker)
+            self.clipboard_worker = None
+
+    def on_clipboard_changed(self):
+        """剪贴板内容变化：最近出现过的内容直接显示保存的合计，否则在后台求和"""
+        mime = QApplication.clipboard().mimeData()
+        if mime is None or not mime.hasText():
+            return
+        text = mime.text()
+        key = payload_hash(text)
+        if key == self.clipboard_key:
+            # 同一次复制可能触发多次 dataChanged
+            return
+        self.clipboard_key = key
+        self.cancel_clipboard_worker()
+
+        result = self.clipboard_results.get(key)
+        if result is not None:
+            self.show_clipboard_sum(result)
+            return
+        worker = ClipboardSumWorker(key, text)
+        worker.signals.finished.connect(partial(self.on_clipboard_sum, worker))
+        worker.signals.failed.connect(partial(self.on_clipboard_failed, worker))
+        self.clipboard_worker = worker
+        self.clipboard_display.setText("剪贴板：正在求和…")
+        QThreadPool.globalInstance().start(worker)
+
+    def on_clipboard_sum(self, worker, result):
+        if worker is not self.clipboard_worker:
+            return
+        self.clipboard_worker = None
+        self.clipboard_results.put(worker.key, result)
+        self.show_clipboard_sum(result)
+
+    def on_clipboard_failed(self, worker, message):
+        if worker is not self.clipboard_worker:
+            return
+        self.clipboard_worker = None
+        self.clipboard_key = None
+        self.clipboard_display.setText(f"剪贴板：求和时出错：{message}")
+
+    def show_clipboard_sum(self, result):
+        count, total = result
+        if not count:
+            self.clipboard_display.setText("剪贴板：没有数字")
+        else:
+            self.clipboard_display.setText(f"剪贴板：{count:,} 个数字，合计 {total:,}")
+
+    def show_totals(self, items):
+        """对表格各列（或各分组）的合计 [(名称, 合计), ...] 求和
+
+        合计都是非负整数时与提取的数字一样放入输入框；含有小数或负数时
+        输入框无法表示（不能以负数开头），只读显示带名称的合计，计算使用精确值。
+        """
+        values = [value for _, value in items]
+        if all(isinstance(value, int) and value >= 0 for value in values):
+            self.show_numbers(values)
+            return
+        
+        self.clear()
+        self.cancel_live_worker()
+        self.edit_history.clear()
+        steps = SumSteps(values, list(accumulate(values)))
+        self.extracted_numbers = steps
+        preview = " + ".join(f"{name} {format_number(value)}"
+                             for name, value in items[:EXTRACT_DISPLAY_LIMIT])
+        if len(items) > EXTRACT_DISPLAY_LIMIT:
+            preview += f" + …（共 {len(items):,} 项）"
+        self.is_formatting = True
+        self.input_area.setPlainText(f"{preview}（点击“清除”后可重新输入）")
+        self.is_formatting = False
+        self.input_area.setReadOnly(True)
+        
+        self.trace_model.set_steps([], steps)
+        self.result_display.setText(f"= {format_number(steps.total())}")
 
 def main():
+    # --startup-profile：输出启动各阶段耗时，首次绘制后退出
+    profiler = None
+    if "--startup-profile" in sys.argv:
+        profiler = StartupProfiler(STARTUP_BEGIN)
+        profiler.mark("导入模块")
+    
+    # CALC_LATENCY：记录按键相关方法的耗时，退出时写入 JSON 文件
+    latency_path = dump_path_from_env()
+    recorder = None
+    if latency_path:
+        recorder = LatencyRecorder()
+        instrument(CalculatorQt, LATENCY_METHODS, recorder)
+    
     app = QApplication(sys.argv)
     # 设置应用程序图标（任务栏图标）
     if os.path.exists(ICON_PATH):
         app.setWindowIcon(QIcon(ICON_PATH))
-    window = CalculatorQt()
+    if profiler:
+        profiler.mark("创建 QApplication")
+    
+    # 计算历史在后台线程中写入数据库
+    history = None
+    history_path = history_path_from_env()
+    if history_path and not profiler:
+        history = History(history_path)
+        history.start()
+        app.aboutToQuit.connect(history.close)
+    
+    window = CalculatorQt(profiler, history)
     window.show()
+    app.aboutToQuit.connect(window.stop_workers)
+    
+    if recorder:
+        window.latency_overlay = LatencyOverlay(recorder, window)
+        app.aboutToQuit.connect(partial(recorder.dump, latency_path))
+    
+    if not profiler and "--new-instance" not in sys.argv:
+        # 接收之后启动的进程转交的参数
+        server = InstanceServer(window)
+        server.message_received.connect(window.on_instance_message)
+        server.listen()
+    
+    args = launch_arguments(sys.argv)
+    if args:
+        QTimer.singleShot(0, partial(window.handle_arguments, args))
+    
+    if profiler:
+        profiler.mark("显示窗口")
+        
+        def on_first_paint():
+            profiler.mark("首次绘制")
+            profiler.report()
+            app.quit()
+        
+        # 事件循环处理完显示和绘制事件后才会执行
+        QTimer.singleShot(0, on_first_paint)
+    
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+"""监视剪贴板时的去重（不依赖界面）
+
+每次剪贴板变化都要提取数字并求和，同样的内容反复复制时不必重新计算：
+按内容的哈希值保存最近几次的结果，命中时直接使用。只保存哈希值和
+(数字个数, 合计)，不保存剪贴板文本本身。
+"""
+
+import hashlib
+from collections import OrderedDict
+
+# 保存结果的最近剪贴板内容数
+RECENT_PAYLOADS = 32
+
+
+def payload_hash(text):
+    """剪贴板文本的哈希值（16 字节）"""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class RecentPayloads:
+    """最近剪贴板内容的哈希值 -> 结果，超出数量时丢弃最久没有用到的"""
+
+    def __init__(self, limit=RECENT_PAYLOADS):
+        self.limit = limit
+        self.results = OrderedDict()
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        """返回保存的结果，没有时返回 None"""
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.limit:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
@@ -0,0 +1,194 @@
+"""CSV/TSV 表格按列求合计（不依赖界面）
+
+用 csv 模块逐行读取文件，只保留每一列（或每个分组每一列）的合计，
+内存占用与文件行数无关（分组时与不同分组的个数有关）。
+
+金额按十进制精确相加：整数直接相加，小数按小数位数分别累加整数，
+最后合成 int 或 Fraction，不会有浮点误差。支持千位分隔符、货币符号
+和会计格式的负数，例如 "¥1,234.50"、"(300)"。
+"""
+
+import codecs
+import csv
+import os
+import re
+from fractions import Fraction
+
+# 用于判断编码和分隔符的文件开头长度（字节）
+SAMPLE_SIZE = 64 * 1024
+# 每读取这么多行报告一次进度、检查一次是否取消
+PROGRESS_ROWS = 10_000
+
+_AMOUNT_PATTERN = re.compile(r'([-+]?)[¥￥$€£]?([0-9]*)(?:\.([0-9]*))?')
+
+
+def parse_amount(text):
+    """把单元格解析为 (整数, 小数位数)，不是数字时返回 None
+
+    "1,234.50" -> (123450, 2)，"(300)" -> (-300, 0)
+    """
+    text = text.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    if negative:
+        text = text[1:-1].strip()
+    match = _AMOUNT_PATTERN.fullmatch(text.replace(',', ''))
+    if not match:
+        return None
+    sign, whole, fraction = match.groups()
+    fraction = fraction or ''
+    if not whole and not fraction:
+        return None
+    value = int(whole + fraction)
+    if (sign == '-') != negative:
+        value = -value
+    return value, len(fraction)
+
+
+class _ExactSum:
+    """按小数位数分别累加的精确合计"""
+    __slots__ = ('sums', 'count')
+
+    def __init__(self):
+        self.sums = {}  # 小数位数 -> 整数合计
+        self.count = 0  # 计入的数字个数
+
+    def add(self, value, scale):
+        self.sums[scale] = self.sums.get(scale, 0) + value
+        self.count += 1
+
+    def value(self):
+        """合计（int 或 Fraction），没有计入任何数字时返回 None"""
+        if not self.count:
+            return None
+        total = sum(Fraction(value, 10 ** scale) for scale, value in self.sums.items())
+        return total.numerator if total.denominator == 1 else total
+
+
+def detect_format(path):
+    """根据文件开头判断编码和 csv 方言，返回 (encoding, dialect)"""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(sample)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'gbk'  # Excel 在中文 Windows 上导出的 CSV
+    text = sample.decode(encoding, errors='ignore')
+
+    if os.path.splitext(path)[1].lower() == '.tsv':
+        return encoding, csv.excel_tab
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=',\t;|')
+    except csv.Error:
+        dialect = csv.excel
+    return encoding, dialect
+
+
+def read_header(path):
+    """返回表头（第一行）的列名列表"""
+    encoding, dialect = detect_format(path)
+    with open(path, encoding=encoding, errors='replace', newline='') as f:
+        return next(csv.reader(f, dialect), [])
+
+
+def resolve_column(header, spec):
+    """列名或从 1 开始的序号 -> 列的下标，找不到时抛出 ValueError"""
+    spec = spec.strip()
+    names = [name.strip() for name in header]
+    if spec in names:
+        return names.index(spec)
+    if spec.isdigit() and 1 <= int(spec) <= len(header):
+        return int(spec) - 1
+    raise ValueError(f"找不到列：{spec}")
+
+
+class TableTotals:
+    """column_totals 的结果
+
+    names 为合计的列名，groups 为 {分组值: [各列合计]}（不分组时键为 None），
+    没有数字的列合计为 None。
+    """
+
+    def __init__(self, names, groups, rows):
+        self.names = names
+        self.groups = groups
+        self.rows = rows
+
+    def items(self):
+        """[(名称, 合计), ...]，按分组第一次出现的顺序，跳过没有数字的列"""
+        items = []
+        for group, values in self.groups.items():
+            for name, value in zip(self.names, values):
+                if value is None:
+                    continue
+                if group is None:
+                    label = name
+                else:
+                    label = group if len(self.names) == 1 else f"{group} {name}"
+                items.append((label, value))
+        return items
+
+
+def column_totals(path, columns=None, group_by=None, progress=None, is_cancelled=None):
+    """一次读完文件，计算指定列的合计
+
+    columns 为列名或序号的列表，为空时合计分组列以外的所有列（只保留含有数字的列）；
+    group_by 为分组列的列名或序号。progress(百分比) 用于报告进度，
+    is_cancelled() 返回 True 时停止读取并返回 None。
+    """
+    encoding, dialect = detect_format(path)
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as raw, \
+            open(raw.fileno(), encoding=encoding, errors='replace', newline='',
+                 closefd=False) as f:
+        reader = csv.reader(f, dialect)
+        header = next(reader, [])
+        group_index = resolve_column(header, group_by) if group_by else None
+        # 没有指定列时合计除分组列以外的所有列
+        indexes = ([resolve_column(header, spec) for spec in columns] if columns
+                   else [index for index in range(len(header)) if index != group_index])
+
+        groups = {}
+        rows = 0
+        for row in reader:
+            rows += 1
+            if rows % PROGRESS_ROWS == 0:
+                if is_cancelled and is_cancelled():
+                    return None
+                if progress:
+                    progress(min(99, os.lseek(raw.fileno(), 0, os.SEEK_CUR) * 100 // size))
+
+            key = None
+            if group_index is not None:
+                key = row[group_index].strip() if group_index < len(row) else ''
+            sums = groups.get(key)
+            if sums is None:
+                sums = groups[key] = [_ExactSum() for _ in indexes]
+
+            for sum_, index in zip(sums, indexes):
+                if index >= len(row):
+                    continue
+                cell = row[index]
+                try:
+                    # 大多数单元格是整数，先用 int 直接转换
+                    sum_.add(int(cell), 0)
+                except ValueError:
+                    amount = parse_amount(cell)
+                    if amount is not None:
+                        sum_.add(*amount)
+
+    names = [header[index].strip() if index < len(header) else str(index + 1)
+             for index in indexes]
+    totals = {key: [sum_.value() for sum_ in sums] for key, sums in groups.items()}
+    if not columns:
+        # 合计所有列时去掉没有数字的列
+        keep = [i for i in range(len(indexes))
+                if any(values[i] is not None for values in totals.values())]
+        names = [names[i] for i in keep]
+        totals = {key: [values[i] for i in keep] for key, values in totals.items()}
+    if progress:
+        progress(100)
+    return TableTotals(names, totals, rows)
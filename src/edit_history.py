@@ -0,0 +1,132 @@
+"""撤销和重做（不依赖界面）
+
+每一步保存为若干个编辑 (位置, 删除的文本, 插入的文本)，不保存整段文本，
+表达式再长，一次按键也只占几个字符。输入后的自动格式化并入同一步，
+在上一次输入的位置之后短时间内连续输入的字符合并为一步。所有步骤的文本总字符数超过预算时
+丢弃最早的步骤。
+"""
+
+import time
+from collections import deque
+
+# 撤销和重做步骤中删除和插入的文本总字符数上限
+UNDO_BUDGET_CHARS = 1_000_000
+# 间隔小于这个时间（秒）的连续输入合并为一步
+COALESCE_SECONDS = 1.0
+
+
+def _common_prefix(a, b):
+    """a 和 b 相同开头的长度（按二分比较切片，不逐个字符循环）"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff_texts(old, new):
+    """返回把 old 变为 new 的一个编辑 (位置, 删除的文本, 插入的文本)，相同时返回 None"""
+    if old == new:
+        return None
+    start = _common_prefix(old, new)
+    limit = min(len(old), len(new)) - start
+    end = _common_prefix(old[start:][::-1], new[start:][::-1]) if limit else 0
+    end = min(end, limit)
+    return start, old[start:len(old) - end], new[start:len(new) - end]
+
+
+class EditHistory:
+    """撤销和重做的步骤，每一步为 [(位置, 删除的文本, 插入的文本), ...]"""
+
+    def __init__(self, budget=UNDO_BUDGET_CHARS):
+        self.budget = budget
+        self.undo_steps = deque()
+        self.redo_steps = []
+        self.size = 0  # 所有步骤中的字符数
+        self.typing = False  # 最后一步是否为连续输入，可以继续合并
+        self.typing_end = 0  # 连续输入的文本结束的位置，在这里接着输入时才合并
+        self.last_time = 0.0
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.size = 0
+        self.typing = False
+
+    def record(self, position, removed, inserted, merge=False, typing=False):
+        """记录一次已经完成的编辑
+
+        merge 为 True 时并入上一步（例如输入后的自动格式化）；typing 表示
+        输入了一个字符，紧接在上一步输入的文本之后、间隔又很短时合并为一步。
+        编辑同时替换了一段文本时（例如输入和格式化一起比较得到的编辑），
+        替换的范围包含上一步输入的结束位置也算紧接着输入。
+        """
+        if removed == inserted:
+            return
+        size = len(removed) + len(inserted)
+        if size > self.budget:
+            # 无法保存这一步，也就不能撤销到这之前
+            self.clear()
+            return
+
+        for step in self.redo_steps:
+            self.size -= _step_size(step)
+        self.redo_steps.clear()
+
+        now = time.monotonic()
+        if self.undo_steps and (merge or typing and self.typing
+                                and position <= self.typing_end <= position + len(removed)
+                                and now - self.last_time < COALESCE_SECONDS):
+            self.undo_steps[-1].append((position, removed, inserted))
+        else:
+            self.undo_steps.append([(position, removed, inserted)])
+        if merge:
+            # 格式化移动了输入的文本时，结束位置跟着移动
+            if position + len(removed) <= self.typing_end:
+                self.typing_end += len(inserted) - len(removed)
+            elif position < self.typing_end:
+                self.typing_end = position + len(inserted)
+        else:
+            self.typing = typing
+            self.typing_end = position + len(inserted)
+            self.last_time = now
+        self.size += size
+
+        while self.size > self.budget and self.undo_steps:
+            self.size -= _step_size(self.undo_steps.popleft())
+
+    def end_typing(self):
+        """结束连续输入（移动光标、计算等），之后的输入另起一步"""
+        self.typing = False
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo(self):
+        """撤销一步，返回需要依次执行的替换 [(位置, 替换的长度, 新文本), ...]"""
+        if not self.undo_steps:
+            return []
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        self.typing = False
+        return [(position, len(inserted), removed)
+                for position, removed, inserted in reversed(step)]
+
+    def redo(self):
+        """重做一步，返回值与 undo 相同"""
+        if not self.redo_steps:
+            return []
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        self.typing = False
+        return [(position, len(removed), inserted) for position, removed, inserted in step]
+
+
+def _step_size(step):
+    return sum(len(removed) + len(inserted) for _, removed, inserted in step)
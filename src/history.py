@@ -0,0 +1,231 @@
+"""计算历史记录（不依赖界面）
+
+每次计算的表达式和结果保存在 SQLite 数据库（WAL 模式）中，用 FTS5 的
+trigram 索引按数字或表达式片段搜索，例如搜索 "1234" 可以找到 "1,234 + 5"。
+
+record 只把记录放入内存，由后台线程分批写入数据库，不会阻塞界面。
+最近的记录同时保存在环形缓冲区中，打开历史记录时不需要读数据库。
+数据库最多保留 MAX_ENTRIES 条记录，超出时删除最早的记录。
+
+环境变量 CALC_HISTORY 可以指定数据库路径，设为 0 时不记录历史。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+
+ENV_VAR = "CALC_HISTORY"
+
+# 保存的表达式最多这么多个字符，超长的表达式只保存开头
+EXPRESSION_LIMIT = 2000
+# 内存中保留的最近记录数
+RECENT_LIMIT = 200
+# 数据库最多保留的记录数
+MAX_ENTRIES = 100_000
+# 后台线程写入数据库的间隔（秒），积累这么多条记录时立即写入
+FLUSH_INTERVAL = 2.0
+FLUSH_BATCH = 500
+# 等待写入的记录最多这么多条（数据库写入很慢时丢弃最早的记录）
+PENDING_LIMIT = 10_000
+SEARCH_LIMIT = 200
+
+HistoryEntry = namedtuple("HistoryEntry", "created expression result truncated")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY,
+        hash TEXT NOT NULL,
+        expression TEXT NOT NULL,
+        truncated INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        created REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS history_hash ON history(hash);
+    CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN
+        INSERT INTO history_search(rowid, text)
+        VALUES (new.id, replace(new.expression || ' = ' || new.result, ',', ''));
+    END;
+    CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN
+        DELETE FROM history_search WHERE rowid = old.id;
+    END;
+"""
+
+# trigram 索引需要 SQLite 3.34 以上，不支持时使用普通表（搜索时逐行匹配）
+_SEARCH_TABLES = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS history_search USING fts5(text, tokenize='trigram')",
+    "CREATE TABLE IF NOT EXISTS history_search (text TEXT NOT NULL)",
+)
+
+
+def default_path():
+    """数据库的默认位置：Windows 上为 %APPDATA%\\calculator-win\\history.db"""
+    base = os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "calculator-win", "history.db")
+
+
+def path_from_env():
+    """返回数据库路径，CALC_HISTORY 为 0 时返回 None"""
+    value = os.environ.get(ENV_VAR, "").strip()
+    if value == "0":
+        return None
+    return value or default_path()
+
+
+def search_text(text):
+    """用于搜索的文本：去掉千位分隔符，* 和 / 换成 × 和 ÷"""
+    return text.replace(',', '').replace('*', '×').replace('/', '÷')
+
+
+def _connect(path):
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _create_schema(conn):
+    for statement in _SEARCH_TABLES:
+        try:
+            conn.execute(statement)
+            break
+        except sqlite3.OperationalError:
+            continue
+    conn.executescript(_SCHEMA)
+    conn.commit()
+
+
+class History:
+    """计算历史：内存中的最近记录加上后台写入的 SQLite 数据库"""
+
+    def __init__(self, path, recent_limit=RECENT_LIMIT):
+        self.path = path
+        self.recent = deque(maxlen=recent_limit)  # 最新的记录在右边
+        self.pending = deque(maxlen=PENDING_LIMIT)  # 等待写入的 (HistoryEntry, 完整表达式的哈希值)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.failed = False  # 数据库无法打开，不再等待写入
+        self.thread = None
+        self.reader = None  # 搜索用的连接，只在调用 search 的线程中使用
+        self.last = None  # 最近一次记录的 (表达式, 结果)，连续按 Enter 时不重复记录
+
+    def start(self):
+        """启动后台写入线程（同时读入最近的记录）"""
+        self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """写入剩余的记录并结束后台线程"""
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def record(self, expression, result):
+        """记录一次计算，只放入内存，不等待写入"""
+        if self.last is not None and self.last[1] == result and self.last[0] == expression:
+            return
+        self.last = (expression, result)
+        # 大文档模式下表达式中有换行，保存时换成空格
+        entry = HistoryEntry(time.time(), expression[:EXPRESSION_LIMIT].replace('\n', ' '),
+                             result, len(expression) > EXPRESSION_LIMIT)
+        with self.lock:
+            self.recent.append(entry)
+            if self.failed:
+                return
+        # 只保存完整表达式的哈希值，不保留超长的表达式本身
+        digest = hashlib.sha1(expression.replace('\n', ' ').encode("utf-8")).hexdigest()
+        with self.lock:
+            self.pending.append((entry, digest))
+            full = len(self.pending) >= FLUSH_BATCH
+        if full:
+            self.wakeup.set()
+
+    def entries(self):
+        """最近的记录，最新的在前"""
+        with self.lock:
+            return list(reversed(self.recent))
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """搜索包含 query 的记录（表达式或结果），最新的在前"""
+        query = search_text(query).replace('%', '').replace('_', '').strip()
+        if not query:
+            return self.entries()[:limit]
+
+        # 还没有写入数据库的记录
+        with self.lock:
+            results = [entry for entry, _ in reversed(self.pending)
+                       if query in search_text(f"{entry.expression} = {entry.result}")]
+
+        try:
+            if self.reader is None:
+                self.reader = _connect(self.path)
+            rows = self.reader.execute(
+                "SELECT h.created, h.expression, h.result, h.truncated "
+                "FROM history_search s JOIN history h ON h.id = s.rowid "
+                "WHERE s.text LIKE ? ORDER BY h.id DESC LIMIT ?",
+                (f"%{query}%", limit)).fetchall()
+        except sqlite3.Error:
+            rows = []  # 数据库还没有创建或无法打开
+        results.extend(HistoryEntry(created, expression, result, bool(truncated))
+                       for created, expression, result, truncated in rows)
+        return results[:limit]
+
+    # ---------- 后台线程 ----------
+
+    def _run(self):
+        try:
+            conn = _connect(self.path)
+            _create_schema(conn)
+        except (sqlite3.Error, OSError) as e:
+            print(f"History error: {e}")
+            with self.lock:
+                self.failed = True
+                self.pending.clear()
+            return
+        try:
+            self._load_recent(conn)
+            while not self.closed:
+                self.wakeup.wait(FLUSH_INTERVAL)
+                self.wakeup.clear()
+                self._flush(conn)
+            self._flush(conn)
+        finally:
+            conn.close()
+
+    def _load_recent(self, conn):
+        rows = conn.execute(
+            "SELECT created, expression, result, truncated FROM history "
+            "ORDER BY id DESC LIMIT ?", (self.recent.maxlen,)).fetchall()
+        loaded = [HistoryEntry(created, expression, result, bool(truncated))
+                  for created, expression, result, truncated in reversed(rows)]
+        with self.lock:
+            self.recent = deque(loaded + list(self.recent), maxlen=self.recent.maxlen)
+
+    def _flush(self, conn):
+        """把等待写入的记录在一个事务中写入数据库"""
+        with self.lock:
+            batch, self.pending = self.pending, deque(maxlen=PENDING_LIMIT)
+        if not batch:
+            return
+        rows = [(digest, entry.expression, int(entry.truncated), entry.result, entry.created)
+                for entry, digest in batch]
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO history (hash, expression, truncated, result, created) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute(
+                    "DELETE FROM history WHERE id <= (SELECT max(id) FROM history) - ?",
+                    (MAX_ENTRIES,))
+        except sqlite3.Error as e:
+            print(f"History error: {e}")
@@ -0,0 +1,189 @@
+"""输入框格式化：与界面无关的纯函数
+
+format_expression 对整段文本做完整格式化；format_region 只重新格式化
+编辑位置附近的数字和运算符，用于每次按键的增量更新。
+wrap_lines 把很长的表达式分成多行，用于大文档模式；format_paste
+整理一次粘贴的大段文本。
+"""
+
+import re
+
+from calc_engine import OPERATORS
+
+# 可以出现在数字中的字符（含千位分隔符）
+NUMBER_CHARS = frozenset('0123456789,')
+# 数字之间的分隔：空格、换行和运算符（包括还未转换的 * 和 /）
+GAP_CHARS = frozenset(' \n*' + '/' + ''.join(OPERATORS))
+
+# 运算符，或空白和运算符之间的一段文本
+_PART_PATTERN = re.compile('[' + re.escape(''.join(OPERATORS)) + r']|[^\s'
+                           + re.escape(''.join(OPERATORS)) + ']+')
+# 运算符后面的空格，wrap_lines 在这里换行
+_LINE_BREAK_PATTERN = re.compile('[' + re.escape(''.join(OPERATORS)) + '] ')
+
+
+def _compile_formatted_pattern():
+    """已经格式化好的表达式，例如 "1,234 + 5 × 6"（开头和结尾可以是运算符）"""
+    op = '[' + re.escape(''.join(OPERATORS)) + ']'
+    try:
+        # Python 3.11 起支持占有量词，不需要记录回溯位置，长文本快几倍
+        number = r'(?>0|[1-9]\d{0,2}+(?:,\d{3})*+)'
+        return re.compile(f'(?:{op} )?{number}(?: {op} {number})*+(?: {op})?')
+    except re.error:
+        number = r'(?:0|[1-9]\d{0,2}(?:,\d{3})*)'
+        return re.compile(f'(?:{op} )?{number}(?: {op} {number})*(?: {op})?')
+
+
+_FORMATTED_PATTERN = _compile_formatted_pattern()
+
+
+def _format_parts(text, after_number=False):
+    """将文本拆分为格式化后的数字和运算符
+
+    after_number 表示这段文本前面紧挨着一个数字，此时开头的运算符需要保留。
+    """
+    formatted_parts = []
+    last_is_number = after_number
+
+    # 键入的 * 和 / 转换为 × 和 ÷，再一次拆分出所有数字和运算符
+    text = text.replace('*', '×').replace('/', '÷')
+    for part in _PART_PATTERN.findall(text):
+        # 移除逗号
+        part = part.replace(',', '')
+
+        # 如果是运算符
+        if part in OPERATORS:
+            # 如果最后一个是运算符，直接替换
+            if formatted_parts and formatted_parts[-1] in OPERATORS:
+                formatted_parts[-1] = part
+            # 如果前面是数字，添加运算符
+            elif last_is_number:
+                formatted_parts.append(part)
+                last_is_number = False
+        # 如果是数字
+        elif part.isdigit():
+            formatted_parts.append(f"{int(part):,}")
+            last_is_number = True
+
+    return formatted_parts
+
+
+def format_expression(text):
+    """完整格式化整段输入，例如 "1234+5*6" -> "1,234 + 5 × 6" """
+    formatted_text = ' '.join(_format_parts(text.strip()))
+
+    # 如果最后一个字符是运算符，确保它后面有一个空格
+    if formatted_text and formatted_text[-1] in OPERATORS:
+        formatted_text += ' '
+    return formatted_text
+
+
+def format_paste(text):
+    """整理粘贴的文本，返回格式化后的数字和运算符（用空格连接）
+
+    开头的运算符保留，由插入后的增量格式化根据前面的内容决定是否去掉。
+    复制来的内容通常已经是格式化好的，整体匹配一次后直接使用，
+    不再逐个数字转换。
+    """
+    text = text.strip()
+    # 只在含有 * 或 / 时才替换，每次替换都要复制整段文本
+    if '*' in text:
+        text = text.replace('*', '×')
+    if '/' in text:
+        text = text.replace('/', '÷')
+    if _FORMATTED_PATTERN.fullmatch(text):
+        return text
+    return ' '.join(_format_parts(text, after_number=True))
+
+
+def format_region(text, start, end):
+    """增量格式化 text[start:end] 这段刚编辑过的内容
+
+    假定编辑区域以外的文本已经是格式化好的，向两侧扩展到相邻的完整数字
+    和运算符为止，只重新格式化这一小段。返回 (start, end, replacement)，
+    将 text[start:end] 替换为 replacement 后与 format_expression 的结果一致。
+    """
+    length = len(text)
+    start = max(0, min(start, length))
+    end = max(start, min(end, length))
+
+    # 向左扩展：被编辑的数字，以及它前面的空格和运算符
+    while start > 0 and text[start - 1] in NUMBER_CHARS:
+        start -= 1
+    while start > 0 and text[start - 1] in GAP_CHARS:
+        start -= 1
+    if start > 0 and not text[start - 1].isdigit():
+        start = 0  # 前面的内容不是格式化好的数字，退回到完整格式化
+
+    # 向右扩展：被编辑的数字，以及它后面的空格和运算符
+    while end < length and text[end] in NUMBER_CHARS:
+        end += 1
+    while end < length and text[end] in GAP_CHARS:
+        end += 1
+    if end < length and not text[end].isdigit():
+        end = length
+
+    after_number = start > 0
+    before_number = end < length
+    parts = _format_parts(text[start:end], after_number)
+
+    replacement = ' '.join(parts)
+    if after_number and (parts or before_number):
+        replacement = ' ' + replacement
+    if parts and (before_number or parts[-1] in OPERATORS):
+        replacement += ' '
+
+    return start, end, replacement
+
+
+def map_cursor(old, offset, new):
+    """将光标在 old 中的位置映射到格式化后的 new 中
+
+    按光标前的数字和运算符个数定位，忽略空格和逗号的变化。
+    """
+    if offset >= len(old):
+        return len(new)
+
+    significant = sum(1 for char in old[:offset]
+                      if char.isdigit() or char in GAP_CHARS and not char.isspace())
+    if significant == 0:
+        return 0
+
+    for position, char in enumerate(new, 1):
+        if char.isdigit() or char in OPERATORS:
+            significant -= 1
+            if significant == 0:
+                break
+    else:
+        return len(new)
+
+    # 光标在运算符后面时，跳过运算符后的空格
+    if new[position - 1] in OPERATORS:
+        while position < len(new) and new[position] == ' ':
+            position += 1
+    return position
+
+
+def wrap_lines(text, width):
+    """把格式化好的表达式分成每行大约 width 个字符的多行
+
+    在运算符后面的空格处换行，把这个空格替换为换行符，所以文本长度和
+    每个字符的位置都不变。原有的换行保留。
+    """
+    if len(text) <= width:
+        return text
+    lines = []
+    start = 0
+    while True:
+        match = _LINE_BREAK_PATTERN.search(text, start + width)
+        if match is None:
+            break
+        newline = text.find('\n', start, match.end())
+        if newline >= 0:
+            lines.append(text[start:newline])
+            start = newline + 1
+            continue
+        lines.append(text[start:match.end() - 1])
+        start = match.end()
+    lines.append(text[start:])
+    return '\n'.join(lines)
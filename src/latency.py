@@ -0,0 +1,152 @@
+"""按键延迟统计（不依赖界面）
+
+设置环境变量 CALC_LATENCY 后启动计算器时，instrument 会替换指定的方法，
+记录每次调用的耗时。每个方法的耗时保存在固定长度的环形缓冲区中，
+可以随时计算 p50/p95/p99 和耗时分布，退出时写入 JSON 文件。
+
+没有设置环境变量时不会替换任何方法，没有额外开销。
+"""
+
+import inspect
+import json
+import os
+import time
+from array import array
+from functools import wraps
+
+ENV_VAR = "CALC_LATENCY"
+DEFAULT_DUMP_PATH = "latency.json"
+
+# 每个方法保留最近的调用次数
+DEFAULT_CAPACITY = 4096
+# 耗时分布的区间上限（毫秒），最后一个区间为超过 100 ms
+HISTOGRAM_BOUNDS_MS = (1, 2, 4, 8, 16, 33, 50, 100)
+
+
+def dump_path_from_env():
+    """返回 JSON 文件路径，没有启用时返回 None
+
+    CALC_LATENCY 为 .json 结尾的路径时写入这个文件，为其他非空值时写入 latency.json。
+    """
+    value = os.environ.get(ENV_VAR, "").strip()
+    if not value or value == "0":
+        return None
+    return value if value.lower().endswith(".json") else DEFAULT_DUMP_PATH
+
+
+class LatencyBuffer:
+    """一个方法的耗时环形缓冲区（秒）"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.samples = array('d', bytes(8 * capacity))
+        self.capacity = capacity
+        self.index = 0
+        self.count = 0  # 总调用次数
+
+    def add(self, seconds):
+        self.samples[self.index] = seconds
+        self.index = (self.index + 1) % self.capacity
+        self.count += 1
+
+    def values(self):
+        return self.samples[:min(self.count, self.capacity)]
+
+    def summary(self):
+        """返回耗时统计（毫秒）"""
+        values = sorted(self.values())
+        if not values:
+            return {"count": 0}
+
+        def percentile(p):
+            # 最近秩法
+            return values[min(len(values) - 1, max(0, -(-len(values) * p // 100) - 1))] * 1000
+
+        histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in values:
+            ms = value * 1000
+            for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+                if ms <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[-1] += 1
+
+        return {
+            "count": self.count,
+            "samples": len(values),
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": values[-1] * 1000,
+            "histogram_ms": dict(zip([f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS]
+                                     + [f">{HISTOGRAM_BOUNDS_MS[-1]}"], histogram)),
+        }
+
+
+class LatencyRecorder:
+    """记录多个方法的耗时"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def buffer(self, name):
+        if name not in self.buffers:
+            self.buffers[name] = LatencyBuffer(self.capacity)
+        return self.buffers[name]
+
+    def snapshot(self):
+        return {name: buffer.summary() for name, buffer in self.buffers.items()}
+
+    def report(self):
+        """每个方法一行的文字统计"""
+        lines = []
+        for name, stats in self.snapshot().items():
+            if not stats["count"]:
+                continue
+            lines.append(f"{name:<16}n={stats['count']:<7} p50={stats['p50_ms']:.2f} "
+                         f"p95={stats['p95_ms']:.2f} p99={stats['p99_ms']:.2f} "
+                         f"max={stats['max_ms']:.2f} ms")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+
+def _positional_count(func):
+    """func 除 self 外可以接受的位置参数个数，有 *args 时返回 None"""
+    count = 0
+    for param in list(inspect.signature(func).parameters.values())[1:]:
+        if param.kind == param.VAR_POSITIONAL:
+            return None
+        if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+            count += 1
+    return count
+
+
+def _timed(func, add):
+    """返回记录 func 耗时的包装函数"""
+    limit = _positional_count(func)
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if limit is not None:
+            args = args[:limit]
+        start = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            add(time.perf_counter() - start)
+
+    return wrapper
+
+
+def instrument(cls, names, recorder):
+    """替换 cls 的这些方法，记录每次调用的耗时
+
+    需要在创建实例（连接信号）之前调用。信号会传入多余的参数（例如
+    clicked 的 checked），按原方法的参数个数截断后再调用。
+    """
+    for name in names:
+        setattr(cls, name, _timed(getattr(cls, name), recorder.buffer(name).add))
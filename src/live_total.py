@@ -0,0 +1,96 @@
+"""输入时的实时合计
+
+像加法机一样，在末尾追加数字和运算符时只计算新增的一项：
+最后一个运算符之前的部分保存为 Accumulator，末尾正在输入的数字
+单独计算，所以每次按键的开销与表达式长度无关。删除最后一个运算符时
+用 rollback 退回到上一次的状态，其他位置的修改调用 rebuild 重新计算整段文本。
+"""
+
+from calc_engine import OPERATORS, evaluate, tokenize
+
+
+def _last_operator(text):
+    """返回最后一个运算符的位置，没有时返回 -1"""
+    return max(text.rfind(op) for op in OPERATORS)
+
+
+class RunningTotal:
+    """实时合计的状态
+
+    committed_length 为最后一个运算符之后的位置，这之前的数字都已经
+    计入 acc，pending_op 为最后一个运算符。previous 保存上一次计入之前的
+    (acc, pending_op, committed_length)。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.acc = None
+        self.pending_op = None
+        self.committed_length = 0
+        self.valid = True
+        self.previous = None
+
+    def rebuild(self, text):
+        """重新计算整段文本，返回当前结果（无法计算时返回 None）"""
+        self.reset()
+        return self.update_tail(text)
+
+    def update_tail(self, tail):
+        """末尾 text[committed_length:] 变化后更新，返回当前结果
+
+        tail 中新出现的运算符会把它前面的数字计入合计。
+        """
+        if not self.valid:
+            return None
+
+        index = _last_operator(tail)
+        if index >= 0:
+            self.previous = (self.acc.copy() if self.acc else None, self.pending_op,
+                             self.committed_length)
+            try:
+                self._commit(tokenize(tail[:index]), tail[index])
+            except Exception:
+                self.valid = False
+                return None
+            self.committed_length += index + 1
+            tail = tail[index + 1:]
+
+        return self.preview(tokenize(tail))
+
+    def rollback(self):
+        """退回到上一次计入之前的状态，没有保存的状态时返回 False"""
+        if not self.valid or self.previous is None:
+            return False
+        self.acc, self.pending_op, self.committed_length = self.previous
+        self.previous = None
+        return True
+
+    def _commit(self, parts, op):
+        """把以运算符结尾的一段计入合计"""
+        if not parts or isinstance(parts[0], str):
+            raise ValueError("运算符前缺少数字")
+        if self.acc is None:
+            self.acc = evaluate(parts)
+        else:
+            self.acc.push(self.pending_op, parts[0])
+            evaluate(parts, acc=self.acc)
+        self.pending_op = op
+
+    def preview(self, tail_parts):
+        """计算合计加上末尾正在输入的数字的结果（不改变状态）"""
+        if not tail_parts:
+            return self.acc.value() if self.acc else None
+        if len(tail_parts) != 1:
+            return None
+
+        number = tail_parts[0]
+        if self.acc is None:
+            return number
+        acc = self.acc.copy()
+        try:
+            acc.push(self.pending_op, number)
+        except ValueError:
+            return None
+        return acc.value()
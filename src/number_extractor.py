@@ -1,8 +1,13 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import ttkbootstrap as ttk
 import re
 
+from number_scan import iter_number_chunks, map_file
+
+# 提取的数字超过这个数量时，输入框只显示前面一部分
+EXTRACT_DISPLAY_LIMIT = 2000
+
 class NumberExtractor:
     def __init__(self, parent, callback):
         self.dialog = tk.Toplevel(parent)
@@ -66,6 +71,14 @@ class NumberExtractor:
             width=15
         ).pack(side=tk.LEFT, padx=10)
         
+        ttk.Button(
+            btn_container,
+            text="从文件提取",
+            command=lambda: self.extract_from_file(callback),
+            bootstyle="primary",
+            width=15
+        ).pack(side=tk.LEFT, padx=10)
+        
         ttk.Button(
             btn_container,
             text="取消",
@@ -124,6 +137,40 @@ class NumberExtractor:
         except Exception as e:
             messagebox.showerror("错误", f"提取数字时出错：{str(e)}")
     
+    def extract_from_file(self, callback):
+        """从文件中提取数字，文件很大时也不会一次读入内存"""
+        path = filedialog.askopenfilename(parent=self.dialog, title="选择文件")
+        if not path:
+            return
+        
+        try:
+            # 边扫描边求和，只保留前面一部分数字用于显示，内存占用与文件大小无关
+            count = total = 0
+            preview = []
+            with map_file(path) as data:
+                for numbers, _ in iter_number_chunks(data):
+                    count += len(numbers)
+                    total += sum(numbers)
+                    if len(preview) < EXTRACT_DISPLAY_LIMIT:
+                        preview.extend(numbers[:EXTRACT_DISPLAY_LIMIT - len(preview)])
+                    self.dialog.update_idletasks()
+            if not count:
+                messagebox.showinfo("提示", "未找到数字")
+                return
+            
+            # 通过回调函数返回结果，数字太多时同时返回合计
+            result = " + ".join("{:,}".format(num) for num in preview)
+            if count <= EXTRACT_DISPLAY_LIMIT:
+                callback(result)
+            else:
+                callback(f"{result} + …（共 {count:,} 个数字，点击“清除”后可重新输入）", total)
+            
+            # 关闭对话框
+            self.dialog.destroy()
+            
+        except Exception as e:
+            messagebox.showerror("错误", f"提取数字时出错：{str(e)}")
+    
     def center_dialog(self):
         """将对话框居中显示"""
         self.dialog.update_idletasks()
@@ -0,0 +1,62 @@
+"""从文本或文件中提取数字（不依赖界面）
+
+文件通过 mmap 映射到内存，用编译好的字节正则分块扫描，
+数字逐个通过生成器返回，内存占用与文件大小无关。
+适用于 UTF-8、GBK 等数字为 ASCII 字符的编码。
+"""
+
+import mmap
+import re
+from contextlib import contextmanager
+
+NUMBER_PATTERN = re.compile(rb'\d+')
+TEXT_NUMBER_PATTERN = re.compile(r'\d+')
+
+# 每次扫描的长度（字节或字符）
+CHUNK_SIZE = 1024 * 1024
+
+
+def iter_number_chunks(data, chunk_size=CHUNK_SIZE):
+    """分块扫描 data（str、bytes 或 mmap）
+
+    每扫描完一块返回 (这一块中的数字列表, 已扫描的长度)，便于显示进度和中途取消。
+    """
+    pattern = TEXT_NUMBER_PATTERN if isinstance(data, str) else NUMBER_PATTERN
+    size = len(data)
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        next_start = end
+        numbers = []
+        for match in pattern.finditer(data, start, end):
+            if match.end() == end and end < size:
+                # 数字可能被分块边界截断，留到下一块从头扫描
+                next_start = match.start()
+                break
+            numbers.append(int(match.group()))
+        if next_start == start:
+            # 整块都是同一个数字，扩大这一块
+            chunk_size *= 2
+            continue
+        start = next_start
+        yield numbers, start
+
+
+@contextmanager
+def map_file(path):
+    """以只读方式映射文件，空文件返回 b''"""
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''  # 空文件无法映射
+            return
+        with data:
+            yield data
+
+
+def iter_file_numbers(path, chunk_size=CHUNK_SIZE):
+    """逐个返回文件中的所有数字（int）"""
+    with map_file(path) as data:
+        for numbers, _ in iter_number_chunks(data, chunk_size):
+            yield from numbers
@@ -0,0 +1,119 @@
+"""超长表达式的多进程求值
+
+顶层的 + 和 - 把表达式分成互不相关的乘除项，在这些位置把 Tokens 切分为
+若干段，交给进程池分别计算各段的和，最后相加。Tokens 的编码和数字通过
+共享内存传给子进程，不需要序列化成列表。
+
+进程池的启动有固定开销，由调用方（vector_eval.evaluate_value）判断
+表达式是否达到 PARALLEL_THRESHOLD。
+"""
+
+import os
+import re
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from multiprocessing import shared_memory
+
+from calc_engine import OP_CODES, OP_SYMBOLS, Accumulator
+
+# 每个进程分到的段数，段数多于进程数时负载更均匀
+CHUNKS_PER_WORKER = 4
+
+# 编码中的 + 和 -（数字的编码为 0，所以在格式正确的 Tokens 中只会出现在运算符位置）
+_ADD_SUB_PATTERN = re.compile(b'[' + bytes([OP_CODES['+'], OP_CODES['-']]) + b']')
+
+
+def _attach(name):
+    """在子进程中打开共享内存（由父进程负责删除）"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # 子进程与父进程共用同一个 resource_tracker，重复登记不会导致误删
+    return shared_memory.SharedMemory(name=name)
+
+
+def _evaluate_chunk(name, code_count, start, end, big):
+    """计算 tokens[start:end] 这一段的值
+
+    start 为 0 或某个 + / - 运算符的位置，end 为下一段的 start 或总长度。
+    big 为这一段中超出 64 位的数字（下标 -> 整数）。
+    """
+    shm = _attach(name)
+    try:
+        codes = bytes(shm.buf[start:end])
+        first_operand = (start + 1) // 2
+        last_operand = (end + 1) // 2
+        values = array('q')
+        values.frombytes(shm.buf[code_count + 8 * first_operand:code_count + 8 * last_operand])
+    finally:
+        shm.close()
+
+    operands = values.tolist()
+    for index, value in big.items():
+        operands[index - first_operand] = value
+
+    if start == 0:
+        acc = Accumulator(operands[0])
+        pairs = zip(codes[1::2], operands[1:])
+    else:
+        # 从 0 开始，这一段开头的 + 或 - 把第一项计入
+        acc = Accumulator(0)
+        pairs = zip(codes[0::2], operands)
+    push = acc.push
+    for code, operand in pairs:
+        push(OP_SYMBOLS[code], operand)
+    return acc.value()
+
+
+def chunk_bounds(codes, chunks):
+    """在顶层的 + / - 处把编码切分为大约 chunks 段，返回各段的 (start, end)"""
+    length = len(codes)
+    bounds = []
+    start = 0
+    for k in range(1, chunks):
+        match = _ADD_SUB_PATTERN.search(codes, max(start + 1, length * k // chunks))
+        if match is None:
+            break
+        bounds.append((start, match.start()))
+        start = match.start()
+    bounds.append((start, length))
+    return bounds
+
+
+def parallel_value(tokens, workers=None):
+    """多进程计算 tokenize 的结果，不适合时（格式不正确、只有一个核心）返回 None"""
+    if not tokens.is_alternating():
+        return None
+    workers = workers or os.cpu_count() or 1
+    if workers < 2:
+        return None
+
+    codes = tokens.codes
+    values = tokens.operands.values
+    bounds = chunk_bounds(codes, workers * CHUNKS_PER_WORKER)
+    if len(bounds) < 2:
+        return None
+
+    size = len(codes) + len(values) * values.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        shm.buf[:len(codes)] = codes
+        shm.buf[len(codes):size] = memoryview(values).cast('B')
+
+        big = tokens.operands.big
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as executor:
+            futures = []
+            for start, end in bounds:
+                first, last = (start + 1) // 2, (end + 1) // 2
+                chunk_big = {i: v for i, v in big.items() if first <= i < last}
+                futures.append(executor.submit(_evaluate_chunk, shm.name, len(codes),
+                                               start, end, chunk_big))
+            total = sum(future.result() for future in futures)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if isinstance(total, Fraction) and total.denominator == 1:
+        return total.numerator
+    return total
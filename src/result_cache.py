@@ -0,0 +1,108 @@
+"""计算结果缓存
+
+按规范化后的数字和运算符序列缓存计算结果（最近最少使用淘汰）。
+新的表达式如果是在某个已缓存表达式后面追加了几项，只计算新增的部分。
+缓存的键为 Tokens.key()，由几个 bytes 组成，不会为每个数字创建对象。
+"""
+
+from collections import OrderedDict
+
+from calc_engine import evaluate
+
+# 默认缓存条数
+DEFAULT_MAX_ENTRIES = 64
+# 所有缓存条目的数字和运算符总数上限，避免超长表达式占用过多内存
+DEFAULT_MAX_TOKENS = 2_000_000
+# 查找可复用的前缀时，只检查最近使用的几条
+PREFIX_CANDIDATES = 8
+
+
+def _length(key):
+    """键对应的数字和运算符个数"""
+    return len(key[0])
+
+
+def _is_prefix(prefix, key):
+    """prefix 对应的表达式是否为 key 对应的表达式的开头部分"""
+    codes, values, big = prefix
+    if not (key[0].startswith(codes) and key[1].startswith(values)):
+        return False
+    # values 中超出 64 位的位置都记为 0，还需要比较实际的数字
+    count = len(values) // 8
+    return tuple(item for item in key[2] if item[0] < count) == big
+
+
+class ResultCache:
+    """计算结果的 LRU 缓存，支持复用已计算的前缀"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_tokens=DEFAULT_MAX_TOKENS,
+                 trace=False):
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self.trace = trace
+        self.entries = OrderedDict()  # Tokens.key() -> Accumulator
+        self.total_tokens = 0
+
+        # 统计信息
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def evaluate(self, tokens):
+        """计算 tokenize 的结果，返回 Accumulator（不要修改返回的对象）"""
+        key = tokens.key()
+
+        acc = self.entries.get(key)
+        if acc is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return acc
+
+        prefix = self._find_prefix(key)
+        if prefix is not None:
+            self.prefix_hits += 1
+            acc = evaluate(tokens, acc=self.entries[prefix].copy(), start=_length(prefix))
+        else:
+            self.misses += 1
+            acc = evaluate(tokens, trace=self.trace)
+
+        self._store(key, acc)
+        return acc
+
+    def _find_prefix(self, key):
+        """在最近使用的条目中查找 key 的最长前缀（必须以数字结尾）"""
+        best = None
+        for count, cached in enumerate(reversed(self.entries)):
+            if count >= PREFIX_CANDIDATES:
+                break
+            length = _length(cached)
+            if (length < _length(key) and length % 2 == 1
+                    and (best is None or length > _length(best))
+                    and _is_prefix(cached, key)):
+                best = cached
+        return best
+
+    def _store(self, key, acc):
+        if _length(key) > self.max_tokens:
+            return
+        self.entries[key] = acc
+        self.total_tokens += _length(key)
+
+        while (len(self.entries) > self.max_entries
+               or self.total_tokens > self.max_tokens):
+            old_key, _ = self.entries.popitem(last=False)
+            self.total_tokens -= _length(old_key)
+
+    def clear(self):
+        self.entries.clear()
+        self.total_tokens = 0
+
+    def stats(self):
+        """返回命中统计"""
+        return {
+            "entries": len(self.entries),
+            "tokens": self.total_tokens,
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,96 @@
+"""单实例运行：再次启动时把参数转交给已经运行的计算器
+
+新进程只导入 QtCore 和 QtNetwork，连接到已运行实例的本地套接字，
+发送启动参数后立即退出，不需要加载界面模块和创建窗口。
+
+参数为表达式或文件路径：文件会在已运行的实例中提取数字，
+其他参数作为表达式计算。
+"""
+
+import getpass
+import json
+import os
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# 带这些参数启动时总是新开一个实例
+STANDALONE_FLAGS = ("--new-instance", "--startup-profile")
+
+# 连接和发送的超时时间（毫秒），没有实例在运行时连接会立即失败
+CONNECT_TIMEOUT_MS = 200
+SEND_TIMEOUT_MS = 1000
+
+
+def server_name():
+    """本地套接字名称，每个用户一个"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "default"
+    return f"calculator-win-{user}"
+
+
+def launch_arguments(argv):
+    """返回要处理的参数（去掉 -- 开头的选项），文件路径转换为绝对路径"""
+    args = []
+    for arg in argv[1:]:
+        if arg.startswith("--"):
+            continue
+        args.append(os.path.abspath(arg) if os.path.isfile(arg) else arg)
+    return args
+
+
+def forward_to_running_instance(argv):
+    """把参数发送给已运行的实例，成功时返回 True"""
+    if any(flag in argv for flag in STANDALONE_FLAGS):
+        return False
+
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+
+    socket.write(json.dumps(launch_arguments(argv)).encode("utf-8") + b"\n")
+    sent = socket.waitForBytesWritten(SEND_TIMEOUT_MS)
+    socket.disconnectFromServer()
+    return sent
+
+
+class InstanceServer(QObject):
+    """在第一个实例中接收后来启动的进程转交的参数"""
+    message_received = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        name = server_name()
+        if self.server.listen(name):
+            return True
+        # 上次异常退出时留下的套接字文件会导致监听失败，删除后重试
+        QLocalServer.removeServer(name)
+        return self.server.listen(name)
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def on_ready_read(self, socket):
+        # 先读完所有消息再发出信号，处理消息时可能进入对话框的事件循环，
+        # 期间连接断开后 socket 会被删除
+        messages = []
+        while socket.canReadLine():
+            line = bytes(socket.readLine())
+            try:
+                args = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            if isinstance(args, list):
+                messages.append([str(arg) for arg in args])
+        for args in messages:
+            self.message_received.emit(args)
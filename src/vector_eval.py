@@ -0,0 +1,137 @@
+"""长表达式的 NumPy 快速求值（可选）
+
+提取数字得到的表达式通常是几十万项的纯加法，逐项用 Python 整数计算很慢。
+项数较多且只含 +、-、× 时，用 NumPy 在 int64 上一次求和（× 连乘用 np.prod），
+并根据数字的位数预先判断是否可能溢出：可能溢出的部分改用 Python 整数计算，
+结果始终是精确的。
+
+没有安装 NumPy 或表达式不适合时使用 calc_engine 中的纯 Python 实现。
+NumPy 在第一次遇到长表达式时才导入，不影响启动速度。
+
+更长的表达式如果不能用 NumPy 计算（含 ÷ 或超出 64 位的数字），
+可以交给 parallel_eval 多进程计算。
+"""
+
+import os
+
+from calc_engine import OP_CODES, CompactInts, SumSteps, evaluate
+
+# 数字和运算符少于这个数量时纯 Python 已经足够快
+MIN_VECTOR_TOKENS = 20_000
+
+# 达到这个长度的表达式可以使用多进程计算，可以用环境变量 CALC_PARALLEL_THRESHOLD 修改
+PARALLEL_THRESHOLD = int(os.environ.get("CALC_PARALLEL_THRESHOLD", 400_000))
+
+INT64_MAX = 2 ** 63 - 1
+# 乘积的位数不超过这个值时一定不会超出 int64
+MAX_PRODUCT_BITS = 63
+
+_numpy = None
+
+
+def _load_numpy():
+    """导入 NumPy，没有安装时返回 None"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def _exact_sum(np, values):
+    """int64 数组的精确和
+
+    按最大绝对值分块，保证每一块的和都不会超出 int64，块的和再用 Python 整数相加。
+    """
+    if not len(values):
+        return 0
+    max_abs = max(-int(values.min()), int(values.max()))
+    if max_abs == 0:
+        return 0
+    block = INT64_MAX // max_abs
+    if block >= len(values):
+        return int(values.sum())
+    return sum(np.add.reduceat(values, np.arange(0, len(values), block)).tolist())
+
+
+def _bit_lengths(np, values):
+    """每个数字的二进制位数（大于 2**53 的数字可能多算一位，只会更保守）"""
+    return np.frexp(values.astype(np.float64))[1]
+
+
+def vector_value(tokens):
+    """用 NumPy 计算只含 +、-、× 的长表达式，不适合时返回 None"""
+    if (len(tokens) < MIN_VECTOR_TOKENS or tokens.operands.big
+            or not tokens.is_alternating()):
+        return None
+    ops = tokens.codes[1::2]
+    if OP_CODES['÷'] in ops:
+        return None
+    np = _load_numpy()
+    if np is None:
+        return None
+
+    values = np.frombuffer(tokens.operands.values, dtype=np.int64)
+    if int(values.min()) < 0:
+        return None
+    op_array = np.frombuffer(ops, dtype=np.uint8)
+
+    big_terms = []  # 可能超出 int64 的乘积：(项的下标, Python 整数)
+    if OP_CODES['×'] not in ops:
+        terms = values.copy()
+        negative = op_array == OP_CODES['-']
+    else:
+        # 每一项（连乘）的起始位置
+        starts = np.concatenate(([0], np.flatnonzero(op_array != OP_CODES['×']) + 1))
+        unsafe = np.add.reduceat(_bit_lengths(np, values), starts) > MAX_PRODUCT_BITS
+        terms = np.multiply.reduceat(values, starts)
+        if unsafe.any():
+            ends = np.append(starts[1:], len(values))
+            for index in np.flatnonzero(unsafe).tolist():
+                product = 1
+                for value in values[starts[index]:ends[index]].tolist():
+                    product *= value
+                big_terms.append((index, product))
+                terms[index] = 0
+        negative = op_array[starts[1:] - 1] == OP_CODES['-']
+
+    # 第一项总是加，之后的项按运算符取正负
+    terms[1:][negative] *= -1
+    total = _exact_sum(np, terms)
+    for index, product in big_terms:
+        total += -product if index and negative[index - 1] else product
+    return total
+
+
+def evaluate_value(tokens, parallel_threshold=None, workers=None):
+    """计算 tokenize 结果的精确值，长表达式尽量使用 NumPy
+
+    parallel_threshold 不为 None 时，长度达到这个值、又不能用 NumPy 计算的
+    表达式使用 workers 个进程计算（默认为 CPU 核心数）。
+    """
+    value = vector_value(tokens)
+    if value is None and parallel_threshold is not None and len(tokens) >= parallel_threshold:
+        # 只在需要时导入，避免启动时加载多进程模块
+        from parallel_eval import parallel_value
+        value = parallel_value(tokens, workers)
+    if value is None:
+        value = evaluate(tokens).value()
+    return value
+
+
+def sum_steps(numbers):
+    """纯加法的计算步骤（SumSteps），数字较多时用 NumPy 计算前缀和"""
+    if (len(numbers) >= MIN_VECTOR_TOKENS // 2 and isinstance(numbers, CompactInts)
+            and not numbers.big):
+        np = _load_numpy()
+        if np is not None:
+            values = np.frombuffer(numbers.values, dtype=np.int64)
+            # 所有数字非负且 数量 × 最大值 不超过 int64 时，前缀和不会溢出
+            if int(values.min()) >= 0 and int(values.max()) * len(values) <= INT64_MAX:
+                totals = CompactInts()
+                totals.values.frombytes(np.cumsum(values).tobytes())
+                return SumSteps(numbers, totals)
+    return SumSteps(numbers)
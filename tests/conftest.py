@@ -0,0 +1,6 @@
+"""测试直接导入 src 中的模块（与程序本身一样按脚本方式导入）"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from calc_cli import evaluate_line, main
+
+
+def test_evaluate_line():
+    assert evaluate_line("1,234 + 5*6\n") == {
+        "expression": "1,234 + 5*6", "result": "1,264", "exact": "1264"}
+    assert evaluate_line("10/4")["exact"] == "5/2"
+
+
+@pytest.mark.parametrize("line, error", [
+    ("-5", "表达式必须以数字开头"),
+    ("1.5+2", "无法识别的字符：."),
+    ("3 +", "表达式不能以运算符结尾"),
+    ("8 ÷ 0", "除数不能为零"),
+    ("1 + + 2", "数字和运算符必须交替出现"),
+])
+def test_malformed_lines_are_reported(line, error):
+    assert evaluate_line(line) == {"expression": line, "error": error}
+
+
+def run(tmp_path, lines, *options):
+    source = tmp_path / "input.txt"
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    output = tmp_path / "output.jsonl"
+    code = main(["eval", str(source), "-o", str(output), *options])
+    return code, [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_exit_code_and_line_numbers(tmp_path):
+    code, results = run(tmp_path, ["1 + 2", "", "-5"])
+    assert code == 1
+    assert [result["line"] for result in results] == [1, 3]
+    assert results[0]["exact"] == "3"
+    assert "error" in results[1]
+
+    code, _ = run(tmp_path, ["1 + 2", "3 × 4"])
+    assert code == 0
+
+
+def test_workers_keep_input_order(tmp_path, monkeypatch):
+    import calc_cli
+    monkeypatch.setattr(calc_cli, "MIN_SHARD_BYTES", 64)
+    lines = [f"{i} + 1" for i in range(300)]
+    code, results = run(tmp_path, lines, "--workers", "2")
+    assert code == 0
+    assert [result["exact"] for result in results] == [str(i + 1) for i in range(300)]
@@ -0,0 +1,119 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from calc_engine import (CompactInts, ExpressionError, Tokens, evaluate, evaluate_expression,
+                         format_number, tokenize)
+
+
+def reference(parts):
+    """原来基于列表的求值：先乘除后加减，全部用 Fraction 计算"""
+    total = Fraction(0)
+    sign = 1
+    term = Fraction(parts[0])
+    for op, operand in zip(parts[1::2], parts[2::2]):
+        if op == '×':
+            term *= operand
+        elif op == '÷':
+            term /= operand
+        else:
+            total += sign * term
+            sign = 1 if op == '+' else -1
+            term = Fraction(operand)
+    return total + sign * term
+
+
+def random_parts(rng, count, ops='+-×÷'):
+    parts = [rng.randint(0, 10 ** rng.randint(1, 25))]
+    for _ in range(count):
+        parts += [rng.choice(ops), rng.randint(1, 10 ** rng.randint(1, 25))]
+    return parts
+
+
+def test_evaluate_matches_reference():
+    rng = random.Random(1)
+    for _ in range(500):
+        parts = random_parts(rng, rng.randint(0, 12))
+        text = ' '.join(f"{p:,}" if isinstance(p, int) else p for p in parts)
+        assert evaluate(tokenize(text)).value() == reference(parts)
+
+
+def test_traced_steps_match_untraced_value():
+    rng = random.Random(2)
+    for _ in range(200):
+        parts = random_parts(rng, rng.randint(1, 10))
+        text = ' '.join(map(str, parts))
+        traced = evaluate(tokenize(text), trace=True)
+        assert traced.value() == evaluate(tokenize(text)).value()
+        multiply_steps, _ = traced.steps()
+        for left, op, right, result in multiply_steps:
+            assert result == (left * right if op == '×' else Fraction(left) / right)
+
+
+def test_tokenize_ignores_separators_and_keeps_big_numbers():
+    tokens = tokenize("1,234 + 99999999999999999999999 × 2")
+    assert list(tokens) == [1234, '+', 99999999999999999999999, '×', 2]
+    assert tokens.is_alternating()
+
+
+def test_integer_results_stay_integers():
+    assert evaluate_expression("6 ÷ 3 × 5").value() == 10
+    assert isinstance(evaluate_expression("6 ÷ 3").value(), int)
+    assert evaluate_expression("1 ÷ 3").value() == Fraction(1, 3)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "表达式必须以数字开头"),
+    ("+ 5", "表达式必须以数字开头"),
+    ("5 +", "表达式不能以运算符结尾"),
+    ("5 + - 3", "数字和运算符必须交替出现"),
+])
+def test_malformed_expressions(text, message):
+    with pytest.raises(ExpressionError, match=message):
+        evaluate(tokenize(text))
+
+
+def test_malformed_tokens_match_list_evaluation():
+    """格式不正确的 Tokens 与同样内容的列表报告相同的错误"""
+    rng = random.Random(3)
+    for _ in range(2000):
+        codes = bytearray()
+        operands = CompactInts()
+        for _ in range(rng.randint(1, 9)):
+            if rng.random() < 0.55:
+                codes.append(0)
+                operands.append(rng.randint(1, 9))
+            else:
+                codes.append(rng.randint(1, 4))
+        tokens = Tokens(bytes(codes), operands)
+        outcomes = []
+        for parts in (tokens, list(tokens)):
+            try:
+                outcomes.append(evaluate(parts).value())
+            except ExpressionError as e:
+                outcomes.append(str(e))
+        assert outcomes[0] == outcomes[1]
+
+
+def test_trailing_operator_on_long_expression_fails_fast():
+    tokens = tokenize(' + '.join(['1,234'] * 200_000) + ' +')
+    with pytest.raises(ExpressionError, match="运算符结尾"):
+        evaluate(tokens)
+
+
+def test_division_by_zero():
+    with pytest.raises(ValueError, match="除数不能为零"):
+        evaluate_expression("5 ÷ 0")
+
+
+def test_continue_from_accumulator():
+    acc = evaluate(tokenize("1 + 2 × 3"))
+    tokens = tokenize("1 + 2 × 3 × 4 - 5")
+    assert evaluate(tokens, acc=acc.copy(), start=5).value() == 1 + 2 * 3 * 4 - 5
+    assert acc.value() == 7
+
+
+def test_format_number():
+    assert format_number(1234567) == "1,234,567"
+    assert format_number(Fraction(5, 2)) == "2.50"
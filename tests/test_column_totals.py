@@ -0,0 +1,64 @@
+from fractions import Fraction
+
+import pytest
+
+from column_totals import column_totals, parse_amount, read_header
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.50", (123450, 2)),
+    ("¥1,234.50", (123450, 2)),
+    ("(300)", (-300, 0)),
+    ("-.5", (-5, 1)),
+    ("+7", (7, 0)),
+    ("abc", None),
+    ("", None),
+    ("-", None),
+    ("12%", None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+def write(path, text, encoding="utf-8"):
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+def test_exact_column_totals(tmp_path):
+    path = write(tmp_path / "a.csv",
+                 "名称,金额,数量\n"
+                 "a,0.1,1\n"
+                 "b,0.2,2\n"
+                 "c,\"1,000.30\",x\n"
+                 "d,(0.6),3\n")
+    totals = column_totals(path, ["金额", "3"])
+    assert totals.rows == 4
+    assert totals.names == ["金额", "数量"]
+    # 0.1 + 0.2 + 1000.3 - 0.6 按十进制精确相加，正好是整数
+    assert totals.items() == [("金额", 1000), ("数量", 6)]
+    assert isinstance(totals.items()[0][1], int)
+
+
+def test_group_by_and_default_columns(tmp_path):
+    path = write(tmp_path / "b.csv",
+                 "年份,金额,备注\n2024,10,x\n2024,5.5,y\n2025,(3),z\n", encoding="gbk")
+    totals = column_totals(path, None, "年份")
+    # 没有指定列时不合计分组列，也去掉没有数字的列
+    assert totals.names == ["金额"]
+    assert totals.items() == [("2024", Fraction(31, 2)), ("2025", -3)]
+
+
+def test_tsv_and_missing_column(tmp_path):
+    path = write(tmp_path / "c.tsv", "a\tb\n1\t2\n3\n")
+    assert read_header(path) == ["a", "b"]
+    assert column_totals(path, ["a", "b"]).items() == [("a", 4), ("b", 2)]
+    with pytest.raises(ValueError, match="找不到列"):
+        column_totals(path, ["c"])
+
+
+def test_cancel(tmp_path, monkeypatch):
+    import column_totals as module
+    monkeypatch.setattr(module, "PROGRESS_ROWS", 2)
+    path = write(tmp_path / "d.csv", "a\n" + "1\n" * 10)
+    assert column_totals(path, is_cancelled=lambda: True) is None
@@ -0,0 +1,106 @@
+import random
+
+from edit_history import EditHistory, diff_texts
+
+
+def apply(text, edits):
+    for position, length, replacement in edits:
+        text = text[:position] + replacement + text[position + length:]
+    return text
+
+
+def test_diff_texts():
+    assert diff_texts("1,234", "1,234") is None
+    assert diff_texts("12 + 3", "12 + 34") == (6, "", "4")
+    assert diff_texts("1,234", "12,345") == (1, ",234", "2,345")
+    old, new = "aXb", "ab"
+    position, removed, inserted = diff_texts(old, new)
+    assert old[:position] + inserted + old[position + len(removed):] == new
+
+
+def test_random_undo_redo_round_trip():
+    rng = random.Random(1)
+    for _ in range(200):
+        history = EditHistory()
+        texts = [""]
+        text = ""
+        for _ in range(rng.randint(1, 20)):
+            position = rng.randint(0, len(text))
+            removed = text[position:position + rng.randint(0, 3)]
+            inserted = ''.join(rng.choice("0123456789+ ,") for _ in range(rng.randint(0, 3)))
+            if removed == inserted:
+                continue
+            text = text[:position] + inserted + text[position + len(removed):]
+            history.record(position, removed, inserted,
+                           typing=not removed and len(inserted) == 1 and inserted.isdigit())
+            texts.append(text)
+
+        undone = text
+        while history.can_undo():
+            undone = apply(undone, history.undo())
+        assert undone == ""
+        while history.can_redo():
+            undone = apply(undone, history.redo())
+        assert undone == text
+
+
+def test_consecutive_typing_is_one_step():
+    history = EditHistory()
+    for position, digit in enumerate("12345"):
+        history.record(position, "", digit, typing=True)
+    assert apply("12345", history.undo()) == ""
+    assert not history.can_undo()
+
+
+def test_typing_in_different_places_is_separate():
+    history = EditHistory()
+    text = ""
+    for position, inserted, typing in [(0, "500", False), (3, " + ", False),
+                                       (6, "1", True), (7, "2", True), (0, "7", True)]:
+        text = text[:position] + inserted + text[position:]
+        history.record(position, "", inserted, typing=typing)
+    assert text == "7500 + 12"
+    text = apply(text, history.undo())
+    assert text == "500 + 12"
+    text = apply(text, history.undo())
+    assert text == "500 + "
+
+
+def test_typing_follows_formatting_merged_into_the_step():
+    history = EditHistory()
+    text = "123"
+    history.record(0, "", "123")
+    history.record(3, "", "4", typing=True)
+    # 格式化 "1234" -> "1,234" 并入同一步，输入位置后移一位
+    history.record(0, "1234", "1,234", merge=True)
+    history.record(5, "", "5", typing=True)
+    text = "12,345"
+    history.record(0, "1,2345", "12,345", merge=True)
+    assert len(history.undo_steps) == 2
+    assert apply(text, history.undo()) == "123"
+
+
+def test_end_typing_starts_a_new_step():
+    history = EditHistory()
+    history.record(0, "", "1", typing=True)
+    history.end_typing()
+    history.record(1, "", "2", typing=True)
+    assert apply("12", history.undo()) == "1"
+
+
+def test_new_edit_clears_redo():
+    history = EditHistory()
+    history.record(0, "", "1")
+    history.record(1, "", " + ")
+    history.undo()
+    assert history.can_redo()
+    history.record(1, "", "2")
+    assert not history.can_redo()
+
+
+def test_budget_drops_oldest_steps():
+    history = EditHistory(budget=10)
+    for position in range(5):
+        history.record(position * 4, "", "abcd")
+    assert history.size <= 10
+    assert len(history.undo_steps) == 2
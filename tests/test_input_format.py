@@ -0,0 +1,61 @@
+import random
+
+from calc_engine import OPERATORS
+from input_format import format_expression, format_paste, format_region, map_cursor, wrap_lines
+
+KEYS = "0123456789" * 3 + "+-*/×÷ ,"
+
+
+def random_expression(rng):
+    return ''.join(rng.choice(KEYS) for _ in range(rng.randint(0, 30)))
+
+
+def test_format_expression():
+    assert format_expression("1234+5*6") == "1,234 + 5 × 6"
+    assert format_expression("1,2,3,4 / 2 -") == "1,234 ÷ 2 - "
+    assert format_expression("++12") == "12"
+
+
+def test_format_region_splice_matches_full_format():
+    """在格式化好的文本中编辑一处，增量格式化与整段格式化结果相同"""
+    rng = random.Random(1)
+    for _ in range(5000):
+        text = format_expression(random_expression(rng))
+        position = rng.randint(0, len(text))
+        if rng.random() < 0.3 and position < len(text):
+            removed = rng.randint(1, min(3, len(text) - position))
+            edited = text[:position] + text[position + removed:]
+            added = 0
+        else:
+            inserted = ''.join(rng.choice(KEYS) for _ in range(rng.randint(1, 3)))
+            edited = text[:position] + inserted + text[position:]
+            added = len(inserted)
+        start, end, replacement = format_region(edited, position, position + added)
+        assert edited[:start] + replacement + edited[end:] == format_expression(edited), \
+            (text, edited)
+
+
+def test_map_cursor_keeps_position_after_typed_digit():
+    old = "1234"
+    new = format_expression(old)
+    assert map_cursor(old, 4, new) == len(new)
+    assert map_cursor(old, 2, new) == 3  # "1,2|34"
+
+
+def test_format_paste_matches_format_expression():
+    """粘贴的文本开头的运算符保留（插入后再决定去掉），其余与整段格式化相同"""
+    rng = random.Random(2)
+    for _ in range(1000):
+        text = random_expression(rng)
+        pasted = format_paste(text)
+        if pasted[:1] in OPERATORS:
+            pasted = pasted[1:]
+        assert pasted.strip() == format_expression(text).strip()
+
+
+def test_wrap_lines_keeps_length_and_positions():
+    text = format_expression(' + '.join(str(i * 1000) for i in range(500)))
+    wrapped = wrap_lines(text, 100)
+    assert len(wrapped) == len(text)
+    assert wrapped.replace('\n', ' ') == text
+    assert max(map(len, wrapped.split('\n'))) < 120
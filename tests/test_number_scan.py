@@ -0,0 +1,41 @@
+import pytest
+
+from number_scan import iter_file_numbers, iter_number_chunks, map_file
+
+
+def collect(data, chunk_size):
+    numbers = []
+    scanned = []
+    for chunk, position in iter_number_chunks(data, chunk_size):
+        numbers.extend(chunk)
+        scanned.append(position)
+    return numbers, scanned
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 7, 1024])
+def test_numbers_split_across_chunk_boundaries(chunk_size):
+    text = "a12 345x6789,0 12345678901234567890 end 42"
+    expected = [12, 345, 6789, 0, 12345678901234567890, 42]
+    for data in (text, text.encode()):
+        numbers, scanned = collect(data, chunk_size)
+        assert numbers == expected
+        assert scanned == sorted(scanned) and scanned[-1] == len(data)
+
+
+def test_number_longer_than_chunk():
+    assert collect("x" + "9" * 50 + "y", 4)[0] == [int("9" * 50)]
+
+
+def test_mapped_file(tmp_path):
+    path = tmp_path / "numbers.txt"
+    content = "金额 1,234 元\n" * 1000
+    path.write_text(content, encoding="gbk")
+    with map_file(str(path)) as data:
+        assert collect(data, 100)[0] == [1, 234] * 1000
+    assert list(iter_file_numbers(str(path), chunk_size=64)) == [1, 234] * 1000
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(iter_file_numbers(str(path))) == []
@@ -0,0 +1,53 @@
+from calc_engine import evaluate, tokenize
+from live_total import RunningTotal
+from result_cache import ResultCache
+
+
+def test_cache_hits_and_prefix_reuse():
+    cache = ResultCache(trace=True)
+    first = tokenize("1 + 2 × 3")
+    assert cache.evaluate(first).value() == 7
+    assert cache.evaluate(tokenize("1 + 2 × 3")).value() == 7
+    longer = tokenize("1 + 2 × 3 × 4 - 10 ÷ 4")
+    acc = cache.evaluate(longer)
+    assert acc.value() == evaluate(longer).value()
+    assert acc.steps() == evaluate(longer, trace=True).steps()
+    assert cache.stats()["hits"] == 1 and cache.stats()["prefix_hits"] == 1
+    # 继续追加不影响已缓存的结果
+    assert cache.evaluate(first).value() == 7
+
+
+def test_cache_limits():
+    cache = ResultCache(max_entries=2, max_tokens=10)
+    for text in ("1 + 1", "2 + 2", "3 + 3"):
+        cache.evaluate(tokenize(text))
+    assert len(cache.entries) == 2
+    cache.evaluate(tokenize(" + ".join(["1"] * 10)))
+    assert cache.stats()["tokens"] <= 10
+
+
+def test_running_total_follows_typing():
+    running = RunningTotal()
+    text = ""
+    for char in "12 + 3 × 4 - 5":
+        text += char
+        value = running.update_tail(text[running.committed_length:])
+        if text.strip()[-1].isdigit():
+            assert value == evaluate(tokenize(text)).value()
+    assert running.rebuild("1 + 2 × 3") == 7
+
+
+def test_running_total_rollback():
+    running = RunningTotal()
+    running.rebuild("10 + ")
+    assert running.update_tail("5 ×") == 15  # × 后面还没有数字
+    # 删除最后的运算符后退回到 "10 + " 之后的状态
+    assert running.rollback()
+    assert running.update_tail("5") == 15
+    assert not running.rollback()
+
+
+def test_running_total_invalid_text():
+    running = RunningTotal()
+    assert running.rebuild("+ 5 +") is None
+    assert running.update_tail("3") is None
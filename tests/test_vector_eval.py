@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from calc_engine import CompactInts, evaluate, tokenize
+from parallel_eval import chunk_bounds, parallel_value
+from vector_eval import MIN_VECTOR_TOKENS, evaluate_value, sum_steps, vector_value
+
+
+def long_expression(rng, count, ops, high=10 ** 6):
+    parts = [str(rng.randint(0, high))]
+    for _ in range(count):
+        parts += [rng.choice(ops), str(rng.randint(1, high))]
+    return tokenize(' '.join(parts))
+
+
+@pytest.mark.parametrize("ops, high", [
+    ("+-", 10 ** 6),
+    ("+-×", 10 ** 6),
+    ("+×", 2 ** 40),  # 乘积超出 int64，需要改用 Python 整数
+])
+def test_evaluate_value_matches_evaluate(ops, high):
+    tokens = long_expression(random.Random(1), MIN_VECTOR_TOKENS, ops, high)
+    assert evaluate_value(tokens) == evaluate(tokens).value()
+
+
+def test_vector_value_skips_unsuitable_expressions():
+    rng = random.Random(2)
+    assert vector_value(long_expression(rng, 10, "+")) is None
+    assert vector_value(long_expression(rng, MIN_VECTOR_TOKENS, "+÷")) is None
+
+
+def test_sum_steps():
+    numbers = CompactInts(range(1, MIN_VECTOR_TOKENS))
+    steps = sum_steps(numbers)
+    assert steps.total() == sum(range(1, MIN_VECTOR_TOKENS))
+    assert steps[0] == (1, '+', 2, 3)
+    assert len(steps) == len(numbers) - 1
+    assert sum_steps([5]).total() == 5
+
+
+def test_chunk_bounds_split_at_add_and_subtract():
+    tokens = tokenize("1 × 2 + 3 ÷ 4 - 5 × 6 + 7")
+    bounds = chunk_bounds(tokens.codes, 3)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(tokens)
+    for start, _ in bounds[1:]:
+        assert tokens[start] in ('+', '-')
+
+
+def test_parallel_value_matches_evaluate():
+    rng = random.Random(3)
+    tokens = long_expression(rng, 2000, "+-×÷")
+    tokens = tokenize(' + '.join([' '.join(map(str, tokens)), str(2 ** 70)]))
+    assert parallel_value(tokens, workers=2) == evaluate(tokens).value()
+    assert parallel_value(tokenize("1 +"), workers=2) is None